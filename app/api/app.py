@@ -4,7 +4,12 @@ from fastapi import FastAPI
 from routes.scraper_router import router as scraper
 from routes.embedding_router import router as embedding
 from routes.sample_router import router as sample
+from routes.stats_router import router as stats
+from routes.image_router import router as image
 from data.database import startup, shutdown_db_client
+from data.http_client import HttpClients
+from scraper_engine.process_pool import ScraperProcessPool
+from services.job_service import ScrapeJobService
 
 # from data.database import shutdown_db_client, startup
 
@@ -15,6 +20,14 @@ app = FastAPI(root_path="/api")
 app.include_router(scraper, prefix="/scraper", tags=["scraper"])
 app.include_router(embedding, prefix="/embedding", tags=["embedding"])
 app.include_router(sample, prefix="/sample", tags=["sample"])
+app.include_router(stats, prefix="/stats", tags=["stats"])
+app.include_router(image, prefix="/image", tags=["image"])
 
 app.add_event_handler("startup", startup)
+app.add_event_handler("startup", HttpClients.startup)
+app.add_event_handler("startup", ScraperProcessPool.startup)
+app.add_event_handler("startup", ScrapeJobService.startup)
+app.add_event_handler("shutdown", ScrapeJobService.shutdown)
 app.add_event_handler("shutdown", shutdown_db_client)
+app.add_event_handler("shutdown", HttpClients.shutdown)
+app.add_event_handler("shutdown", ScraperProcessPool.shutdown)
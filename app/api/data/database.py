@@ -2,6 +2,10 @@ import logging
 import os
 from beanie import init_beanie
 from models.sample_model import Sample
+from models.scraper_model import ScraperResult
+from models.job_model import ScrapeJob
+from models.image_model import StoredImage
+from models.embedding_model import CachedEmbedding
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
 
@@ -14,6 +18,10 @@ async def instantiate_database():
         database=client[os.environ["MONGO_INITDB_DATABASE"]],
         document_models=[
             Sample,
+            ScraperResult,
+            ScrapeJob,
+            StoredImage,
+            CachedEmbedding,
         ],
     )
 
@@ -0,0 +1,263 @@
+from pydantic import BaseModel, Field
+from models.stats_model import HttpClientName, HttpClientStats
+from urllib.parse import urlparse
+from typing import Any, AsyncContextManager, Dict, List, Optional
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import partial
+import asyncio
+import httpx
+import logging
+import os
+
+
+logger = logging.getLogger("uvicorn")
+
+# Negotiate HTTP/2 with the servers supporting it (needs the 'h2' package)
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "false").lower() in ("1", "true")
+# Hosts whose per host limit is remembered by each client (the least recently used
+# idle ones are forgotten beyond it)
+HTTP_MAX_HOST_LIMITS = int(os.environ.get("HTTP_MAX_HOST_LIMITS", "1000"))
+
+
+class HttpClientSettings(BaseModel):
+    """
+    Settings of a shared client, read from the environment variables
+    `<prefix>_MAX_CONNECTIONS`, `<prefix>_MAX_KEEPALIVE_CONNECTIONS`,
+    `<prefix>_MAX_CONNECTIONS_PER_HOST`, `<prefix>_MAX_REDIRECTS`,
+    `<prefix>_CONNECT_TIMEOUT` and `<prefix>_READ_TIMEOUT`.
+    """
+
+    max_connections: int = Field(100, title="Size of the connection pool")
+    max_keepalive_connections: int = Field(20, title="Idle connections kept alive")
+    max_connections_per_host: Optional[int] = Field(
+        None, title="Requests in flight per host (no limit if None)"
+    )
+    follow_redirects: bool = Field(False, title="Follow the redirections")
+    max_redirects: int = Field(5, title="Maximum number of redirections")
+    connect_timeout: float = Field(5.0, title="Connection timeout in seconds")
+    read_timeout: float = Field(5.0, title="Read timeout in seconds")
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults) -> "HttpClientSettings":
+        for field in cls.model_fields:
+            value = os.environ.get(f"{prefix}_{field.upper()}")
+            if value is not None:
+                defaults[field] = value
+        return cls(**defaults)
+
+
+HTTP_CLIENT_SETTINGS = {
+    HttpClientName.SCRAPER: HttpClientSettings.from_env(
+        "SCRAPER_HTTP", max_connections_per_host=6
+    ),
+    HttpClientName.IMAGE: HttpClientSettings.from_env(
+        "IMAGE", max_connections_per_host=6, follow_redirects=True, read_timeout=10
+    ),
+    HttpClientName.CLIP: HttpClientSettings.from_env("CLIP_HTTP"),
+}
+
+
+class StatsTransport(httpx.AsyncHTTPTransport):
+    """
+    Transport counting the requests going through the connection pool, and the
+    connections it opens (from the httpcore `trace` extension of the requests)
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+        self.in_flight = 0
+        self.failures = 0
+        self.connections_opened = 0
+
+    async def trace(self, forward: Optional[Any], event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        if forward is not None:  # trace extension of the caller
+            await forward(event, info)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = partial(
+            self.trace, request.extensions.get("trace")
+        )
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+
+class HostLimit:
+    """
+    Semaphore bounding the requests in flight to a host, counting its users (the
+    requests holding or waiting for it) so that an idle one can be forgotten.
+    """
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+    async def __aenter__(self) -> None:
+        self.users += 1
+        try:
+            await self.semaphore.acquire()
+        except BaseException:
+            self.users -= 1
+            raise
+
+    async def __aexit__(self, *exc) -> None:
+        self.semaphore.release()
+        self.users -= 1
+
+
+class HttpClients:
+    """
+    Per-worker registry of the shared HTTP clients (scraper, images, CLIP inference).
+
+    A client keeps its connections alive across requests, so that pages, images and
+    embeddings do not pay a TCP and TLS handshake for each call. Clients are opened
+    at startup (or on first use) and closed at shutdown, and are recreated if the
+    event loop they were bound to has changed (the previous ones are closed on their
+    loop if it still runs, else dropped with a warning).
+    """
+
+    _clients: Dict[HttpClientName, httpx.AsyncClient] = {}
+    _transports: Dict[HttpClientName, StatsTransport] = {}
+    _host_limits: Dict[HttpClientName, "OrderedDict[str, HostLimit]"] = {}
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _http2: Optional[bool] = None
+
+    @classmethod
+    def http2(cls) -> bool:
+        if cls._http2 is None:
+            cls._http2 = HTTP2_ENABLED
+            if HTTP2_ENABLED:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("HTTP/2 needs the 'h2' package, using HTTP/1.1")
+                    cls._http2 = False
+        return cls._http2
+
+    @classmethod
+    def get(cls, name: HttpClientName) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            cls.drop()
+            cls._loop = loop
+        client = cls._clients.get(name)
+        if client is None or client.is_closed:
+            settings = HTTP_CLIENT_SETTINGS[name]
+            limits = httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+            )
+            transport = StatsTransport(http2=cls.http2(), limits=limits)
+            client = httpx.AsyncClient(
+                transport=transport,
+                limits=limits,
+                timeout=httpx.Timeout(
+                    settings.read_timeout, connect=settings.connect_timeout
+                ),
+                follow_redirects=settings.follow_redirects,
+                max_redirects=settings.max_redirects,
+            )
+            cls._clients[name] = client
+            cls._transports[name] = transport
+            cls._host_limits[name] = OrderedDict()
+        return client
+
+    @classmethod
+    def host_limit(cls, name: HttpClientName, url: str) -> AsyncContextManager:
+        """
+        Semaphore bounding the requests in flight to the host of the url (a no-op
+        context if the client has no per host limit). The limits of the hosts are
+        kept in LRU order, and beyond `HTTP_MAX_HOST_LIMITS` hosts the least
+        recently used ones nobody holds are forgotten.
+        """
+        limit = HTTP_CLIENT_SETTINGS[name].max_connections_per_host
+        if not limit:
+            return nullcontext()
+        cls.get(name)
+        host_limits = cls._host_limits[name]
+        host = urlparse(url).netloc
+        host_limit = host_limits.get(host)
+        if host_limit is not None:
+            host_limits.move_to_end(host)
+            return host_limit
+        host_limit = host_limits[host] = HostLimit(limit)
+        excess = len(host_limits) - HTTP_MAX_HOST_LIMITS
+        if excess > 0:
+            idle = []
+            for other, other_limit in host_limits.items():
+                if len(idle) == excess:
+                    break
+                if not other_limit.users and other != host:
+                    idle.append(other)
+            for other in idle:
+                del host_limits[other]
+        return host_limit
+
+    @classmethod
+    def drop(cls) -> None:
+        """
+        Forgets the clients bound to the previous event loop. Their connections
+        belong to that loop: they are closed on it if it still runs (in another
+        thread), else they cannot be closed any more and are dropped with a warning.
+        """
+        loop = cls._loop
+        for name, client in cls._clients.items():
+            if client.is_closed:
+                continue
+            if loop is not None and loop.is_running() and not loop.is_closed():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            else:
+                logger.warning(
+                    f"Dropping the '{name.value}' HTTP client of a finished event "
+                    "loop without closing its connections"
+                )
+        cls._clients, cls._transports, cls._host_limits = {}, {}, {}
+
+    @classmethod
+    async def startup(cls) -> None:
+        for name in HttpClientName:
+            cls.get(name)
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        if cls._loop is asyncio.get_running_loop():
+            for name, client in cls._clients.items():
+                try:
+                    await client.aclose()
+                except Exception:
+                    logger.warning(
+                        f"Failed to close the '{name.value}' HTTP client", exc_info=True
+                    )
+        cls.drop()
+        cls._loop = None
+
+    @classmethod
+    def stats(cls) -> List[HttpClientStats]:
+        stats = []
+        for name in HttpClientName:
+            settings = HTTP_CLIENT_SETTINGS[name]
+            client_stats = HttpClientStats(
+                name=name,
+                http2=cls.http2(),
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+            )
+            transport = cls._transports.get(name)
+            if transport is not None:
+                client_stats.connections_opened = transport.connections_opened
+                client_stats.hosts = len(cls._host_limits.get(name, ()))
+                client_stats.requests = transport.requests
+                client_stats.in_flight = transport.in_flight
+                client_stats.failures = transport.failures
+            stats.append(client_stats)
+        return stats
@@ -1,7 +1,24 @@
+from beanie import Document
 from pydantic import BaseModel, Field
 from models.sample_model import Sample
 from typing import Literal, List
+from datetime import datetime, timezone
 from enum import Enum
+import os
+
+
+# Cosine similarity above which two samples are near-duplicates
+EMBEDDING_SIMILARITY_THRESHOLD = float(
+    os.environ.get("EMBEDDING_SIMILARITY_THRESHOLD", "0.95")
+)
+# Bytes of the block of similarities computed at once by the near-duplicate search
+EMBEDDING_SIMILARITY_BLOCK_BYTES = int(
+    os.environ.get("EMBEDDING_SIMILARITY_BLOCK_BYTES", str(256 * 2**20))
+)
+# Bytes of embeddings kept in memory by each worker, in front of the Mongo cache
+EMBEDDING_CACHE_MAX_BYTES = int(
+    os.environ.get("EMBEDDING_CACHE_MAX_BYTES", str(32 * 2**20))
+)
 
 
 class EmbeddingSampleType(str, Enum):
@@ -25,3 +42,20 @@ class EmbeddingResponse(BaseModel):
         "Vectors were successfully extracted.",
         title="status message",
     )
+
+
+class CachedEmbedding(Document):
+    """
+    Embedding of a content, shared by the workers and by every sample of the same
+    content. The key is the model, the type and the SHA-256 of the content (of
+    the image bytes for an image).
+    """
+
+    id: str = Field(..., alias="_id", title="Model, type and hash of the content")
+    vector: bytes = Field(..., title="Embedding (little-endian float32)")
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), title="Storage time"
+    )
+
+    class Settings:
+        name = "embedding_cache"
@@ -0,0 +1,28 @@
+from beanie import Document
+from pydantic import Field
+from datetime import datetime, timezone
+import os
+
+
+# Largest side (in pixels) of a thumbnail served by GET /image/{id}
+IMAGE_THUMBNAIL_MAX_SIZE = int(os.environ.get("IMAGE_THUMBNAIL_MAX_SIZE", "1024"))
+
+
+class StoredImage(Document):
+    """
+    Image bytes stored once, keyed by their SHA-256: an image sample holds this
+    key (`ScraperMetaData.image_id`) instead of the base64 image, so the same
+    logo scraped from many pages is stored a single time.
+    """
+
+    id: str = Field(..., alias="_id", title="SHA-256 of the image bytes")
+    data: bytes = Field(..., title="Image bytes")
+    media_type: str = Field(..., title="Media type of the image")
+    width: int = Field(..., title="Width of the image in pixels")
+    height: int = Field(..., title="Height of the image in pixels")
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), title="Storage time"
+    )
+
+    class Settings:
+        name = "images"
@@ -0,0 +1,83 @@
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel
+from typing import Optional
+from datetime import datetime, timezone
+from enum import Enum
+from models.scraper_model import ScraperRequest, ScraperResponse
+from scraper_engine.deadline import SCRAPER_MAX_REQUEST_TIMEOUT
+import os
+
+
+# Scrape jobs run at the same time by each uvicorn worker
+SCRAPER_JOB_WORKERS = int(os.environ.get("SCRAPER_JOB_WORKERS", "4"))
+# Seconds between two looks at the queue (or at a job polled with `wait`)
+SCRAPER_JOB_POLL_INTERVAL = float(os.environ.get("SCRAPER_JOB_POLL_INTERVAL", "0.5"))
+# Seconds after which a running job is considered lost and is run again, at least a
+# minute past the longest deadline of a request so that a job still running is
+# never run twice
+SCRAPER_JOB_TIMEOUT = max(
+    float(os.environ.get("SCRAPER_JOB_TIMEOUT", "360")),
+    SCRAPER_MAX_REQUEST_TIMEOUT + 60,
+)
+# Longest wait accepted by a long-poll, and seconds a finished job is kept
+SCRAPER_JOB_MAX_WAIT = float(os.environ.get("SCRAPER_JOB_MAX_WAIT", "30"))
+SCRAPER_JOB_TTL = int(os.environ.get("SCRAPER_JOB_TTL", "86400"))
+
+
+class ScrapeJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ScrapeJob(Document):
+    """
+    Scrape job shared by the uvicorn workers through Mongo. `active_key` is set
+    while the job is pending or running, and unset once it is finished: its unique
+    sparse index makes a second submission of the same url, mode, language, parser
+    and number of best nodes join the job instead of creating one.
+    """
+
+    request: ScraperRequest = Field(..., title="Scrape request")
+    key: str = Field(..., title="Normalized url, mode, language, parser and k")
+    active_key: Optional[str] = Field(
+        default=None, title="Key of the job while it is pending or running"
+    )
+    status: ScrapeJobStatus = Field(ScrapeJobStatus.PENDING, title="Job status")
+    result: Optional[ScraperResponse] = Field(default=None, title="Scrape response")
+    error: Optional[str] = Field(default=None, title="Error of a failed job")
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), title="Submission time"
+    )
+    started_at: Optional[datetime] = Field(default=None, title="Start time")
+    finished_at: Optional[datetime] = Field(default=None, title="End time")
+
+    class Settings:
+        name = "scrape_jobs"
+        indexes = [
+            IndexModel([("active_key", ASCENDING)], unique=True, sparse=True),
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+            IndexModel(
+                [("finished_at", ASCENDING)], expireAfterSeconds=SCRAPER_JOB_TTL
+            ),
+        ]
+
+
+class ScrapeJobResponse(BaseModel):
+    id: str = Field(..., title="Id of the job")
+    status: ScrapeJobStatus = Field(..., title="Job status")
+    request: ScraperRequest = Field(..., title="Scrape request")
+    result: Optional[ScraperResponse] = Field(
+        default=None, title="Scrape response, once the job is done"
+    )
+    error: Optional[str] = Field(default=None, title="Error of a failed job")
+    created_at: datetime = Field(..., title="Submission time")
+    finished_at: Optional[datetime] = Field(default=None, title="End time")
+
+    @classmethod
+    def from_job(cls, job: ScrapeJob) -> "ScrapeJobResponse":
+        return cls(
+            id=str(job.id), **job.model_dump(include=set(cls.model_fields) - {"id"})
+        )
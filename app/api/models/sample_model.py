@@ -1,8 +1,9 @@
 from beanie import Document, PydanticObjectId
 from models.scraper_model import ScraperMetaData, ScraperType
 from pydantic import BaseModel, Field
-from typing import Union
+from typing import List, Optional, Union
 from enum import Enum
+import struct
 
 
 SampleType = ScraperType
@@ -19,12 +20,34 @@ class SampleRequest(BaseModel):
     metadata: ScraperMetaData = Field(..., description="The metadata of the sample")
 
 
+class SampleEmbedding(BaseModel):
+    """
+    CLIP embedding of a sample, stored as little-endian float32 (4 bytes per
+    dimension) with the model that computed it.
+    """
+
+    model: str = Field(..., description="The CLIP model of the embedding")
+    vector: bytes = Field(..., description="The embedding (little-endian float32)")
+
+    @classmethod
+    def from_vector(cls, model: str, vector: List[float]) -> "SampleEmbedding":
+        return cls(model=model, vector=struct.pack(f"<{len(vector)}f", *vector))
+
+    def to_vector(self) -> List[float]:
+        return list(struct.unpack(f"<{len(self.vector) // 4}f", self.vector))
+
+
 class Sample(Document):
     id: PydanticObjectId = Field(
         default_factory=PydanticObjectId,
         alias="_id",
     )
     metadata: ScraperMetaData = Field(..., description="The metadata of the sample")
+    embedding: Optional[SampleEmbedding] = Field(
+        default=None,
+        exclude=True,
+        description="The CLIP embedding of the sample (stored, never returned)",
+    )
 
     class Settings:
         collection = "http_samples"
@@ -1,7 +1,27 @@
+from beanie import Document
 from pydantic import BaseModel, Field, HttpUrl
-from typing import Literal, Optional
+from pymongo import ASCENDING, IndexModel
+from typing import List, Literal, Optional
+from datetime import datetime, timezone
 from enum import Enum
 from scraper_engine.language_supported import LanguageSupported
+from scraper_engine.html_parser import HtmlParser
+from scraper_engine.deadline import SCRAPER_MAX_REQUEST_TIMEOUT
+import os
+
+
+# Seconds a scrape result is reused for the same url, mode and language
+SCRAPER_RESULT_TTL = int(os.environ.get("SCRAPER_RESULT_TTL", "86400"))
+# Items accepted by a batch request, and items scraped at the same time
+SCRAPER_BATCH_MAX_ITEMS = int(os.environ.get("SCRAPER_BATCH_MAX_ITEMS", "10000"))
+SCRAPER_BATCH_CONCURRENCY = int(os.environ.get("SCRAPER_BATCH_CONCURRENCY", "16"))
+# Largest number of best nodes returned by a scrape
+SCRAPER_MAX_K = int(os.environ.get("SCRAPER_MAX_K", "20"))
+# Largest page budget and link depth of a crawl
+SCRAPER_CRAWL_MAX_PAGES = int(os.environ.get("SCRAPER_CRAWL_MAX_PAGES", "1000"))
+SCRAPER_CRAWL_MAX_DEPTH = int(os.environ.get("SCRAPER_CRAWL_MAX_DEPTH", "5"))
+# Seconds after which a page is slow, halving the crawl concurrency on its host
+SCRAPER_CRAWL_SLOW_SECONDS = float(os.environ.get("SCRAPER_CRAWL_SLOW_SECONDS", "5"))
 
 
 class ScraperType(str, Enum):
@@ -15,7 +35,25 @@ class ScraperMetaData(BaseModel):
     tag: str = Field(..., title="Html/XSS Tag")
     language: LanguageSupported = Field(..., title="Language of the content")
     type: ScraperType = Field(..., title="Type of the content")
-    content: str = Field(..., title="Text or Image (base 64) of the page")
+    content: str = Field(
+        ..., title="Text or Image (base 64) of the page, empty in a stored image sample"
+    )
+    image_id: Optional[str] = Field(
+        default=None, title="Key of the image in the image store (image samples)"
+    )
+    truncated: bool = Field(
+        False, title="Only a part of the page was scraped (size or node budget)"
+    )
+
+
+class ScraperCandidate(BaseModel):
+    tag: str = Field(..., title="Html/XSS Tag")
+    score: float = Field(..., title="Score of the node")
+    image_url: Optional[str] = Field(default=None, title="Url of the image")
+    content: str = Field(..., title="Text or Image (base 64) of the node")
+    image_id: Optional[str] = Field(
+        default=None, title="Key of the image in the image store (cached images)"
+    )
 
 
 class ScraperResponse(BaseModel):
@@ -27,3 +65,95 @@ class ScraperResponse(BaseModel):
         "Text content was successfully extracted from the page.", title="status message"
     )
     database_log: str = Field(..., title="Database message")
+    cached: bool = Field(False, title="Served from the scrape result cache")
+    candidates: List[ScraperCandidate] = Field(
+        default=[], title="Next best nodes of the page (k - 1 at most), by score"
+    )
+
+
+class ScraperRequest(BaseModel):
+    url: HttpUrl = Field(..., title="Url of the page")
+    image_search: bool = Field(False, title="Search for an image instead of a text")
+    language: LanguageSupported = Field(
+        LanguageSupported.EN, title="Language of the content"
+    )
+    parser: Optional[HtmlParser] = Field(None, title="HTML parser backend")
+    max_age: Optional[int] = Field(
+        None, ge=0, title="Maximum age in seconds of a cached result to reuse"
+    )
+    k: int = Field(
+        1, ge=1, le=SCRAPER_MAX_K, title="Number of non overlapping best nodes"
+    )
+    timeout: Optional[float] = Field(
+        None,
+        gt=0,
+        le=SCRAPER_MAX_REQUEST_TIMEOUT,
+        title="Seconds allowed to the scrape (SCRAPER_REQUEST_TIMEOUT by default)",
+    )
+
+
+class ScraperBatchRequest(BaseModel):
+    items: List[ScraperRequest] = Field(
+        ..., min_length=1, max_length=SCRAPER_BATCH_MAX_ITEMS, title="Pages to scrape"
+    )
+    concurrency: int = Field(
+        SCRAPER_BATCH_CONCURRENCY,
+        ge=1,
+        le=SCRAPER_BATCH_CONCURRENCY,
+        title="Pages scraped at the same time",
+    )
+
+
+class ScraperBatchResponse(ScraperResponse):
+    index: int = Field(..., title="Position of the item in the batch request")
+
+
+class ScraperCrawlRequest(BaseModel):
+    url: HttpUrl = Field(..., title="Url of the seed page")
+    image_search: bool = Field(False, title="Search for an image instead of a text")
+    language: LanguageSupported = Field(
+        LanguageSupported.EN, title="Language of the content"
+    )
+    parser: Optional[HtmlParser] = Field(None, title="HTML parser backend")
+    max_pages: int = Field(
+        100, ge=1, le=SCRAPER_CRAWL_MAX_PAGES, title="Pages scraped at most"
+    )
+    max_depth: int = Field(
+        2, ge=0, le=SCRAPER_CRAWL_MAX_DEPTH, title="Links followed from the seed"
+    )
+    same_host: bool = Field(True, title="Only follow the links to the seed host")
+    concurrency: int = Field(
+        SCRAPER_BATCH_CONCURRENCY,
+        ge=1,
+        le=SCRAPER_BATCH_CONCURRENCY,
+        title="Pages scraped at the same time",
+    )
+
+
+class ScraperCrawlResponse(ScraperResponse):
+    depth: int = Field(..., title="Links followed from the seed to the page")
+    links: int = Field(0, title="New links of the page added to the frontier")
+
+
+class ScraperResult(Document):
+    """
+    Cached scrape result, keyed by the normalized url, the mode, the language and
+    the parser. Mongo removes the results older than `SCRAPER_RESULT_TTL` seconds.
+    """
+
+    key: str = Field(..., title="Normalized url, mode, language and parser")
+    metadata: ScraperMetaData = Field(..., title="Metadata of the content")
+    candidates: List[ScraperCandidate] = Field(default=[], title="Next best nodes")
+    k: int = Field(1, title="Number of best nodes requested by the scrape")
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), title="Scrape time"
+    )
+
+    class Settings:
+        name = "scraper_results"
+        indexes = [
+            IndexModel([("key", ASCENDING)], unique=True),
+            IndexModel(
+                [("created_at", ASCENDING)], expireAfterSeconds=SCRAPER_RESULT_TTL
+            ),
+        ]
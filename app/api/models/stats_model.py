@@ -0,0 +1,91 @@
+from pydantic import BaseModel, Field
+from typing import List
+from enum import Enum
+from scraper_engine.html_parser import HtmlParser
+
+
+class HttpClientName(str, Enum):
+    SCRAPER = "scraper"  # web pages
+    IMAGE = "image"  # images of the web pages
+    CLIP = "clip"  # CLIP inference sidecar
+
+
+class HttpClientStats(BaseModel):
+    name: HttpClientName = Field(..., title="Name of the client")
+    http2: bool = Field(..., title="HTTP/2 negotiation enabled")
+    max_connections: int = Field(..., title="Size of the connection pool")
+    max_keepalive_connections: int = Field(..., title="Idle connections kept alive")
+    connections_opened: int = Field(
+        0, title="Connections opened (the other requests reused a kept-alive one)"
+    )
+    hosts: int = Field(0, title="Hosts whose requests in flight are bounded")
+    requests: int = Field(0, title="Requests sent")
+    in_flight: int = Field(0, title="Requests waiting for their response")
+    failures: int = Field(0, title="Requests failed at the transport level")
+
+
+class HttpStatsResponse(BaseModel):
+    clients: List[HttpClientStats] = Field(
+        ..., title="Connection pool statistics of the shared HTTP clients (per worker)"
+    )
+
+
+class TemplateStats(BaseModel):
+    domain: str = Field(..., title="Host of the pages")
+    image_search: bool = Field(..., title="Image mode")
+    parser: HtmlParser = Field(..., title="HTML parser backend")
+    path: str = Field(..., title="Path of the best node, e.g. 'html[0]/body[0]/p[2]'")
+    score: float = Field(0, title="Lowest score of the node on the pages electing it")
+    confirmations: int = Field(1, title="Scrapes in a row electing the path")
+    uses: int = Field(0, title="Scrapes of the domain once the path was confirmed")
+    hits: int = Field(0, title="Scrapes served by the template")
+    fallbacks: int = Field(0, title="Scrapes falling back to the whole page")
+    audits: int = Field(0, title="Scrapes scoring the whole page to check the path")
+    active: bool = Field(False, title="Confirmed enough times to be used")
+
+
+class TemplateStatsResponse(BaseModel):
+    hits: int = Field(..., title="Scrapes served by a template")
+    fallbacks: int = Field(..., title="Scrapes whose template did not hold")
+    misses: int = Field(
+        ..., title="Scrapes of a domain without a confirmed template (or auditing it)"
+    )
+    audits: int = Field(..., title="Scrapes scoring the whole page to check a template")
+    templates: List[TemplateStats] = Field(
+        ..., title="Extraction templates of the domains (per worker process)"
+    )
+
+
+class BatchSizeBucket(BaseModel):
+    le: int = Field(..., title="Largest batch size of the bucket")
+    count: int = Field(0, title="Batches of more than le / 2 and at most le items")
+
+
+class MicroBatcherStats(BaseModel):
+    name: str = Field(..., title="Name of the batcher")
+    max_size: int = Field(..., title="Items sent at most in one batch")
+    window: float = Field(..., title="Seconds a batch waits for items after its first")
+    batches: int = Field(0, title="Batches sent")
+    items: int = Field(0, title="Items sent")
+    full_batches: int = Field(0, title="Batches sent as soon as they were full")
+    failures: int = Field(0, title="Batches failed")
+    mean_wait: float = Field(0.0, title="Mean seconds an item waited for its batch")
+    sizes: List[BatchSizeBucket] = Field(..., title="Histogram of the batch sizes")
+
+
+class EmbeddingCacheStats(BaseModel):
+    max_bytes: int = Field(..., title="Bytes of embeddings kept in memory at most")
+    bytes: int = Field(0, title="Bytes of embeddings kept in memory")
+    entries: int = Field(0, title="Embeddings kept in memory")
+    memory_hits: int = Field(0, title="Embeddings found in memory")
+    store_hits: int = Field(0, title="Embeddings found in the Mongo tier")
+    misses: int = Field(0, title="Embeddings computed by the CLIP sidecar")
+
+
+class EmbeddingStatsResponse(BaseModel):
+    batchers: List[MicroBatcherStats] = Field(
+        ..., title="Micro-batchers of the CLIP requests (per worker process)"
+    )
+    cache: EmbeddingCacheStats = Field(
+        ..., title="Embedding cache (memory tier per worker process)"
+    )
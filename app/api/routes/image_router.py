@@ -0,0 +1,40 @@
+from fastapi import APIRouter, status, Header, Path, Query
+from fastapi.responses import Response
+from models.image_model import IMAGE_THUMBNAIL_MAX_SIZE
+from services.image_store_service import ImageStoreService
+from typing import Optional
+import logging
+
+
+router = APIRouter()
+logger = logging.getLogger("uvicorn")
+
+# The bytes behind a key never change: clients and proxies may keep them for good
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+# curl -X GET "http://localhost/api/image/<id>?size=128" --output image
+@router.get(
+    "/{id}",
+    response_description="Get a stored image, or its thumbnail if `size` is set",
+    status_code=status.HTTP_200_OK,
+    response_class=Response,
+    responses={200: {"content": {"image/*": {}}}, 304: {}, 404: {}},
+)
+async def get_image(
+    id: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    size: Optional[int] = Query(default=None, ge=1, le=IMAGE_THUMBNAIL_MAX_SIZE),
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    etag = f'"{id}"' if size is None else f'"{id}-{size}"'
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+    if if_none_match is not None and etag in if_none_match:
+        await ImageStoreService.check(id)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if size is None:
+        image = await ImageStoreService.get(id)
+        data, media_type = image.data, image.media_type
+    else:
+        data, media_type = await ImageStoreService.get_thumbnail(id, size)
+    return Response(content=data, media_type=media_type, headers=headers)
@@ -1,8 +1,23 @@
-from fastapi import APIRouter, status, Body
+from fastapi import APIRouter, status, Body, Header, Query
+from fastapi.responses import StreamingResponse
 from pydantic import HttpUrl
-from models.scraper_model import ScraperResponse
+from beanie import PydanticObjectId
+from models.scraper_model import (
+    ScraperResponse,
+    ScraperBatchRequest,
+    ScraperBatchResponse,
+    ScraperCrawlRequest,
+    ScraperCrawlResponse,
+    ScraperRequest,
+    SCRAPER_MAX_K,
+)
+from models.job_model import ScrapeJobResponse, SCRAPER_JOB_MAX_WAIT
 from services.scraper_service import ScraperService
+from services.job_service import ScrapeJobService
 from scraper_engine.language_supported import LanguageSupported
+from scraper_engine.html_parser import HtmlParser
+from scraper_engine.deadline import SCRAPER_MAX_REQUEST_TIMEOUT
+from typing import Optional
 import logging
 
 
@@ -26,6 +41,111 @@ async def scrape_page(
     url: HttpUrl = Body(...),
     image_search: bool = Body(default=False),
     language: LanguageSupported = Body(default=LanguageSupported.EN),
+    parser: Optional[HtmlParser] = Body(default=None),
+    max_age: Optional[int] = Body(default=None, ge=0),
+    k: int = Body(default=1, ge=1, le=SCRAPER_MAX_K),
+    timeout: Optional[float] = Body(default=None, gt=0, le=SCRAPER_MAX_REQUEST_TIMEOUT),
+    x_request_timeout: Optional[float] = Header(
+        default=None, gt=0, le=SCRAPER_MAX_REQUEST_TIMEOUT
+    ),
 ) -> ScraperResponse:
     logger.info(f"Scraping page: {url}")
-    return await ScraperService.get_best_page_text(url, image_search, language)
+    return await ScraperService.get_best_page_text(
+        url,
+        image_search,
+        language,
+        parser=parser,
+        max_age=max_age,
+        k=k,
+        timeout=timeout if timeout is not None else x_request_timeout,
+    )
+
+
+# curl -X POST "http://localhost/api/scraper/batch" \
+#      -H "Content-Type: application/json" \
+#      -d '{
+#          "items": [
+#              {"url": "https://www.hcompany.ai/", "image_search": false},
+#              {"url": "https://en.wikipedia.org/wiki/RoboCop", "image_search": true}
+#          ]
+#     }'
+@router.post(
+    "/batch",
+    response_description="Scrape webpages, streaming one JSON response per line",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={200: {"model": ScraperBatchResponse}},
+)
+async def scrape_pages(
+    request: ScraperBatchRequest = Body(...),
+) -> StreamingResponse:
+    logger.info(f"Scraping {len(request.items)} pages")
+    return StreamingResponse(
+        (
+            response.model_dump_json() + "\n"
+            async for response in ScraperService.get_best_pages_text(request)
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+# curl -X POST "http://localhost/api/scraper/crawl" \
+#      -H "Content-Type: application/json" \
+#      -d '{
+#          "url": "https://www.hcompany.ai/",
+#          "max_pages": 20,
+#          "max_depth": 2
+#     }'
+@router.post(
+    "/crawl",
+    response_description="Crawl a website from a page, streaming one JSON response per line",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={200: {"model": ScraperCrawlResponse}},
+)
+async def crawl_pages(
+    request: ScraperCrawlRequest = Body(...),
+) -> StreamingResponse:
+    logger.info(f"Crawling {request.max_pages} pages from: {request.url}")
+    return StreamingResponse(
+        (
+            response.model_dump_json() + "\n"
+            async for response in ScraperService.crawl_pages(request)
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+# curl -X POST "http://localhost/api/scraper/jobs" \
+#      -H "Content-Type: application/json" \
+#      -d '{
+#          "url": "https://www.hcompany.ai/",
+#          "image_search": false
+#     }'
+@router.post(
+    "/jobs",
+    response_description="Queue a scrape of a webpage",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ScrapeJobResponse,
+)
+async def submit_scrape_job(
+    request: ScraperRequest = Body(...),
+) -> ScrapeJobResponse:
+    logger.info(f"Queueing scrape job: {request.url}")
+    job = await ScrapeJobService.submit(request)
+    return ScrapeJobResponse.from_job(job)
+
+
+# curl -X GET "http://localhost/api/scraper/jobs/<id>?wait=10"
+@router.get(
+    "/jobs/{id}",
+    response_description="Get a scrape job, waiting up to `wait` seconds for its end",
+    status_code=status.HTTP_200_OK,
+    response_model=ScrapeJobResponse,
+)
+async def get_scrape_job(
+    id: PydanticObjectId,
+    wait: float = Query(default=0, ge=0, le=SCRAPER_JOB_MAX_WAIT),
+) -> ScrapeJobResponse:
+    job = await ScrapeJobService.get(id, wait=wait)
+    return ScrapeJobResponse.from_job(job)
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, status
+from models.stats_model import (
+    EmbeddingStatsResponse,
+    HttpStatsResponse,
+    TemplateStatsResponse,
+)
+from data.http_client import HttpClients
+from services.clip_service import ClipService
+from services.embedding_cache import embedding_cache
+from scraper_engine.template_store import template_store
+import logging
+
+
+router = APIRouter()
+logger = logging.getLogger("uvicorn")
+
+
+# curl -X GET "http://localhost/api/stats/http" -H "accept: application/json"
+@router.get(
+    "/http",
+    response_description="Get the connection pool statistics of the HTTP clients",
+    status_code=status.HTTP_200_OK,
+    response_model=HttpStatsResponse,
+)
+async def get_http_stats() -> HttpStatsResponse:
+    return HttpStatsResponse(clients=HttpClients.stats())
+
+
+# curl -X GET "http://localhost/api/stats/templates" -H "accept: application/json"
+@router.get(
+    "/templates",
+    response_description="Get the extraction templates learned for the domains",
+    status_code=status.HTTP_200_OK,
+    response_model=TemplateStatsResponse,
+)
+async def get_template_stats() -> TemplateStatsResponse:
+    return template_store.stats()
+
+
+# curl -X GET "http://localhost/api/stats/embedding" -H "accept: application/json"
+@router.get(
+    "/embedding",
+    response_description="Get the batch and cache statistics of the embeddings",
+    status_code=status.HTTP_200_OK,
+    response_model=EmbeddingStatsResponse,
+)
+async def get_embedding_stats() -> EmbeddingStatsResponse:
+    return EmbeddingStatsResponse(
+        batchers=ClipService.batch_stats(), cache=embedding_cache.stats()
+    )
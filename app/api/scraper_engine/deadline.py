@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Iterator, Optional, TypeVar
+import asyncio
+import os
+import time
+
+
+# Seconds allowed to a scrape request that does not set its own timeout
+SCRAPER_REQUEST_TIMEOUT = float(os.environ.get("SCRAPER_REQUEST_TIMEOUT", "30"))
+# Largest timeout a scrape request can ask for
+SCRAPER_MAX_REQUEST_TIMEOUT = float(
+    os.environ.get("SCRAPER_MAX_REQUEST_TIMEOUT", "300")
+)
+
+T = TypeVar("T")
+
+# Monotonic time at which the current request expires (None without deadline).
+# The tasks started by a request inherit it with the rest of their context.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """
+    Raised by `wait_for` when the deadline of the request expires
+    """
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Sets the deadline of the code in the block `seconds` from now, unless the
+    current deadline is sooner (no new deadline if `seconds` is None).
+    """
+    current = _deadline.get()
+    if seconds is not None:
+        expires = time.monotonic() + seconds
+        if current is None or expires < current:
+            current = expires
+    token = _deadline.set(current)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline (None without deadline)"""
+    expires = _deadline.get()
+    return None if expires is None else max(0.0, expires - time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+async def wait_for(awaitable: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """
+    `asyncio.wait_for` bounded by the deadline: raises `asyncio.TimeoutError`
+    if `timeout` expires first, and `DeadlineExceeded` if the deadline does. The
+    awaitable is cancelled in both cases.
+    """
+    left = remaining()
+    if left is None or (timeout is not None and timeout < left):
+        return await asyncio.wait_for(awaitable, timeout)
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("The deadline of the request expired") from None
@@ -0,0 +1,42 @@
+from bs4 import BeautifulSoup, FeatureNotFound
+from enum import Enum
+from typing import Optional
+import logging
+import os
+
+
+logger = logging.getLogger("uvicorn")
+
+
+class HtmlParser(str, Enum):
+    """
+    HTML parser backends (BeautifulSoup tree builders) supported by the scraper engine.
+    All of them produce the same BeautifulSoup tree API, so scoring and extraction
+    do not depend on the backend.
+    """
+
+    HTML_PARSER = "html.parser"  # pure python, always available
+    LXML = "lxml"  # libxml2, the fastest backend
+    HTML5LIB = "html5lib"  # parses like a web browser, the slowest backend
+
+
+DEFAULT_HTML_PARSER = HtmlParser(
+    os.environ.get("SCRAPER_HTML_PARSER", HtmlParser.HTML_PARSER.value)
+)
+
+
+def parse_html(content: bytes, parser: Optional[HtmlParser] = None) -> BeautifulSoup:
+    """
+    Parses the HTML content with the given backend (or the configured default one),
+    falling back to the built-in "html.parser" when the backend is not installed.
+    """
+
+    parser = parser or DEFAULT_HTML_PARSER
+    try:
+        return BeautifulSoup(content, parser.value)
+    except FeatureNotFound:
+        logger.warning(
+            f"HTML parser '{parser.value}' is not installed, "
+            f"falling back to '{HtmlParser.HTML_PARSER.value}'"
+        )
+        return BeautifulSoup(content, HtmlParser.HTML_PARSER.value)
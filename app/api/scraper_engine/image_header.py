@@ -0,0 +1,87 @@
+from typing import Optional, Tuple
+
+
+# JPEG "start of frame" markers, the ones holding the image size
+JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF,
+}  # fmt: skip
+
+
+def probe_image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Reads the (width, height) of a PNG, GIF, JPEG, WebP or BMP image from the first
+    bytes of the file. Returns None when the format is unknown or when more bytes
+    are needed.
+    """
+
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return _png_size(data)
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return _gif_size(data)
+    if data[:2] == b"\xff\xd8":
+        return _jpeg_size(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _webp_size(data)
+    if data[:2] == b"BM":
+        return _bmp_size(data)
+    return None
+
+
+def _png_size(data: bytes) -> Optional[Tuple[int, int]]:
+    if len(data) < 24 or data[12:16] != b"IHDR":
+        return None
+    return (int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big"))
+
+
+def _gif_size(data: bytes) -> Optional[Tuple[int, int]]:
+    if len(data) < 10:
+        return None
+    return (int.from_bytes(data[6:8], "little"), int.from_bytes(data[8:10], "little"))
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    i = 2
+    while i + 1 < len(data):
+        if data[i] != 0xFF:
+            return None  # corrupted stream
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # markers without payload
+            i += 2
+            continue
+        if i + 4 > len(data):
+            return None
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            height = int.from_bytes(data[i + 5 : i + 7], "big")
+            width = int.from_bytes(data[i + 7 : i + 9], "big")
+            return (width, height)
+        i += 2 + int.from_bytes(data[i + 2 : i + 4], "big")
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30 and data[23:26] == b"\x9d\x01\x2a":
+        width = int.from_bytes(data[26:28], "little") & 0x3FFF
+        height = int.from_bytes(data[28:30], "little") & 0x3FFF
+        return (width, height)
+    if chunk == b"VP8L" and len(data) >= 25 and data[20] == 0x2F:
+        bits = int.from_bytes(data[21:25], "little")
+        return ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if chunk == b"VP8X" and len(data) >= 30:
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return (width, height)
+    return None
+
+
+def _bmp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    if len(data) < 26 or int.from_bytes(data[14:18], "little") < 40:
+        return None  # only the BITMAPINFOHEADER family is supported
+    width = int.from_bytes(data[18:22], "little", signed=True)
+    height = int.from_bytes(data[22:26], "little", signed=True)
+    return (abs(width), abs(height))
@@ -1,12 +1,20 @@
-import requests
 from PIL import Image
 from io import BytesIO
-from xml.etree import ElementTree
-import cairosvg
 from urllib.parse import urlparse
-from typing import Tuple
+from typing import Dict, Tuple
 from pydantic import BaseModel, Field
+from scraper_engine.image_header import probe_image_size
+from scraper_engine.svg_image import svg_render_cache, svg_size
+from data.http_client import HttpClients, HttpClientName
 import base64
+import logging
+import os
+
+
+logger = logging.getLogger("uvicorn")
+
+# Bytes read at most to find the size of a candidate in its header
+IMAGE_PROBE_BYTES = int(os.environ.get("IMAGE_PROBE_BYTES", "65536"))
 
 
 class ImageProcessorMetaData(BaseModel):
@@ -15,17 +23,36 @@ class ImageProcessorMetaData(BaseModel):
     """
 
     url: str = Field(..., title="Url of the image")
-    img_base64: str = Field(..., title="Base64 encoded image")
+    img_base64: str = Field(
+        default="", title="Base64 encoded image (empty until the image is loaded)"
+    )
     size: Tuple[int, int] = Field(..., title="Size of the image")
 
 
 class ImageProcessor:
     """
-    Processes images from the web
+    Processes images from the web.
+
+    Downloads go through the shared image client of the worker (keep-alive
+    connections, capped redirects and timeouts), with at most
+    `IMAGE_MAX_CONNECTIONS_PER_HOST` requests in flight per host.
+
+    Raster candidates are only probed: their size is read from the header in the
+    first bytes of the file, and `load_image` fetches the whole image once a
+    candidate has been chosen. SVG candidates are downloaded, but their size is
+    read from their attributes: they are only rendered (through a cache keyed by
+    their hash) once chosen.
     """
 
     def __init__(self, base_url: str):
         self.base_url = base_url
+        self.svg_sources: Dict[str, bytes] = {}  # probed SVG, until rendered
+
+    async def download(self, url: str) -> bytes:
+        async with HttpClients.host_limit(HttpClientName.IMAGE, url):
+            response = await HttpClients.get(HttpClientName.IMAGE).get(url)
+            response.raise_for_status()
+            return response.content
 
     def correct_relative_url(self, base_url: str, url: str) -> str:
         if url.startswith("//"):
@@ -39,48 +66,100 @@ class ImageProcessor:
     async def get_image_size(self, url: str) -> ImageProcessorMetaData:
         url = self.correct_relative_url(self.base_url, url)
         if url.endswith(".svg"):
-            image_base64, size = await self.get_svg_data(url)
+            size = await self.probe_svg_image_size(url)
         else:
-            image_base64, size = await self.get_raster_image_data(url)
-        return ImageProcessorMetaData(url=url, img_base64=image_base64, size=size)
+            size = await self.probe_raster_image_size(url)
+        return ImageProcessorMetaData(url=url, size=size)
 
-    async def get_raster_image_data(self, url: str) -> Tuple[str, Tuple[int, int]]:
+    async def load_image(
+        self, metadata: ImageProcessorMetaData
+    ) -> ImageProcessorMetaData:
+        """
+        Returns the metadata with the whole image, fetching it if it was only probed.
+        The size is (0, 0) if the image could not be retrieved.
+        """
+        if metadata.img_base64:
+            return metadata
+        if metadata.url.endswith(".svg"):
+            image_base64, size = await self.get_svg_data(metadata.url)
+        else:
+            image_base64, size = await self.get_raster_image_data(metadata.url)
+        return ImageProcessorMetaData(
+            url=metadata.url, img_base64=image_base64, size=size
+        )
+
+    async def probe_raster_image_size(self, url: str) -> Tuple[int, int]:
+        """
+        Reads the size of the image from its first bytes (ranged request, streamed
+        read of at most `IMAGE_PROBE_BYTES`). Unknown formats fall back to a full
+        download decoded with PIL.
+        """
         try:
+            data, complete = bytearray(), False
+            async with HttpClients.host_limit(HttpClientName.IMAGE, url):
+                async with HttpClients.get(HttpClientName.IMAGE).stream(
+                    "GET", url, headers={"Range": f"bytes=0-{IMAGE_PROBE_BYTES - 1}"}
+                ) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        data += chunk
+                        size = probe_image_size(data)
+                        if size is not None:
+                            return size
+                        if len(data) >= IMAGE_PROBE_BYTES:
+                            break
+                    else:
+                        complete = response.status_code == 200  # range ignored
+            if complete:
+                with Image.open(BytesIO(data)) as img:
+                    return img.size
+            return (await self.get_raster_image_data(url))[1]
 
-            response = requests.get(url, allow_redirects=True).content
-            with Image.open(BytesIO(response)) as img:
+        except Exception as e:
+            logger.warning(f"Could not probe image size from {url}: {e}")
+            return (0, 0)
+
+    async def probe_svg_image_size(self, url: str) -> Tuple[int, int]:
+        """
+        Downloads the SVG and reads its size from its attributes. It is rendered
+        only if they do not tell the size.
+        """
+        try:
+            svg_data = await self.download(url)
+            self.svg_sources[url] = svg_data
+            size = svg_size(svg_data)
+            if size is None:
+                png_data = await svg_render_cache.render(svg_data)
+                size = probe_image_size(png_data) or (0, 0)
+            return size
+
+        except Exception as e:
+            logger.warning(f"Could not probe SVG image size from {url}: {e}")
+            return (0, 0)
+
+    async def get_raster_image_data(self, url: str) -> Tuple[str, Tuple[int, int]]:
+        try:
+            response = await self.download(url)
+            with Image.open(BytesIO(response)) as img:  # check it is an image
                 size = img.size
-                buffered = BytesIO()
-                img.save(buffered, format=img.format)
-                img_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-                return (img_base64, size)
+            img_base64 = base64.b64encode(response).decode("utf-8")
+            return (img_base64, size)
 
         except Exception as e:
-            print(f"Could not retrieve image from {url}: {e}")
+            logger.warning(f"Could not retrieve image from {url}: {e}")
             return ("", (0, 0))
 
     async def get_svg_data(self, url: str) -> Tuple[str, Tuple[int, int]]:
+        """
+        Renders the SVG to PNG (downloaded again unless it was probed).
+        """
         try:
-            svg_data = requests.get(url, allow_redirects=True).content
-            svg = ElementTree.fromstring(svg_data)
-            width = svg.get("width", "").replace("px", "")
-            height = svg.get("height", "").replace("px", "")
-
-            if width.isdigit() and height.isdigit():
-                size = (int(width), int(height))
-            else:
-                png_data = cairosvg.svg2png(bytestring=svg_data)
-                if not png_data:
-                    raise ValueError("Could not convert SVG to PNG")
-                with Image.open(BytesIO(png_data)) as img:
-                    size = img.size
-                    buffered = BytesIO()
-                    img.save(buffered, format="PNG")
-                    png_data = buffered.getvalue()
-
+            svg_data = self.svg_sources.pop(url, None) or await self.download(url)
+            png_data = await svg_render_cache.render(svg_data)
+            size = probe_image_size(png_data) or (0, 0)
             img_base64 = base64.b64encode(png_data).decode("utf-8")
             return (img_base64, size)
 
         except Exception as e:
-            print(f"Could not retrieve SVG image info for {url}: {e}")
+            logger.warning(f"Could not retrieve SVG image info for {url}: {e}")
             return ("", (0, 0))
@@ -0,0 +1,207 @@
+from collections import OrderedDict
+from bisect import bisect_right
+from enum import Enum
+from typing import Dict, Optional
+from langdetect import DetectorFactory, detect
+from scraper_engine.language_supported import LanguageSupported
+import hashlib
+import logging
+import os
+import re
+
+
+logger = logging.getLogger("uvicorn")
+
+# Characters of a text given to the detector (taken from its start, middle and end)
+LANGUAGE_SAMPLE_CHARS = int(os.environ.get("LANGUAGE_SAMPLE_CHARS", "1024"))
+# Detections remembered by each process, keyed by the hash of the sample
+LANGUAGE_CACHE_SIZE = int(os.environ.get("LANGUAGE_CACHE_SIZE", "4096"))
+# Detection backend: "langdetect", or "fasttext" (needs the 'fasttext' package and
+# the language identification model at LANGUAGE_FASTTEXT_MODEL)
+LANGUAGE_DETECTOR = os.environ.get("LANGUAGE_DETECTOR", "langdetect")
+LANGUAGE_FASTTEXT_MODEL = os.environ.get("LANGUAGE_FASTTEXT_MODEL", "lid.176.ftz")
+
+# langdetect draws random samples of the text: a fixed seed makes it deterministic
+DetectorFactory.seed = 0
+
+
+class Script(str, Enum):
+    LATIN = "latin"
+    GREEK = "greek"
+    CYRILLIC = "cyrillic"
+    HEBREW = "hebrew"
+    ARABIC = "arabic"
+    DEVANAGARI = "devanagari"
+    GUJARATI = "gujarati"
+    THAI = "thai"
+    HANGUL = "hangul"
+    KANA = "kana"
+    HAN = "han"
+
+
+# Sorted, non overlapping code point ranges [start, end] of the scripts
+SCRIPT_RANGES = [
+    (0x0041, 0x005A, Script.LATIN),
+    (0x0061, 0x007A, Script.LATIN),
+    (0x00C0, 0x024F, Script.LATIN),
+    (0x0370, 0x03FF, Script.GREEK),
+    (0x0400, 0x052F, Script.CYRILLIC),
+    (0x0590, 0x05FF, Script.HEBREW),
+    (0x0600, 0x06FF, Script.ARABIC),
+    (0x0750, 0x077F, Script.ARABIC),
+    (0x0900, 0x097F, Script.DEVANAGARI),
+    (0x0A80, 0x0AFF, Script.GUJARATI),
+    (0x0E00, 0x0E7F, Script.THAI),
+    (0x1100, 0x11FF, Script.HANGUL),
+    (0x1E00, 0x1EFF, Script.LATIN),
+    (0x1F00, 0x1FFF, Script.GREEK),
+    (0x3040, 0x30FF, Script.KANA),
+    (0x3130, 0x318F, Script.HANGUL),
+    (0x31F0, 0x31FF, Script.KANA),
+    (0x3400, 0x4DBF, Script.HAN),
+    (0x4E00, 0x9FFF, Script.HAN),
+    (0xAC00, 0xD7AF, Script.HANGUL),
+    (0xF900, 0xFAFF, Script.HAN),
+    (0xFB50, 0xFDFF, Script.ARABIC),
+    (0xFE70, 0xFEFF, Script.ARABIC),
+    (0xFF66, 0xFF9F, Script.KANA),
+]
+SCRIPT_STARTS = [start for start, _, _ in SCRIPT_RANGES]
+ASCII_LETTER = re.compile("[A-Za-z]")
+KANA_CHARACTER = re.compile("[\u3040-\u30ff\u31f0-\u31ff\uff66-\uff9f]")
+
+# Script of each supported language (Japanese mixes kana with han characters)
+LANGUAGE_SCRIPTS: Dict[LanguageSupported, Script] = {
+    language: Script.LATIN for language in LanguageSupported
+}
+LANGUAGE_SCRIPTS.update(
+    {
+        LanguageSupported.EL: Script.GREEK,
+        LanguageSupported.BG: Script.CYRILLIC,
+        LanguageSupported.MK: Script.CYRILLIC,
+        LanguageSupported.RU: Script.CYRILLIC,
+        LanguageSupported.UK: Script.CYRILLIC,
+        LanguageSupported.HE: Script.HEBREW,
+        LanguageSupported.AR: Script.ARABIC,
+        LanguageSupported.FA: Script.ARABIC,
+        LanguageSupported.UR: Script.ARABIC,
+        LanguageSupported.HI: Script.DEVANAGARI,
+        LanguageSupported.MR: Script.DEVANAGARI,
+        LanguageSupported.GU: Script.GUJARATI,
+        LanguageSupported.TH: Script.THAI,
+        LanguageSupported.KO: Script.HANGUL,
+        LanguageSupported.JA: Script.KANA,
+        LanguageSupported.ZH_CN: Script.HAN,
+        LanguageSupported.ZH_TW: Script.HAN,
+    }
+)
+# Scripts written by a single supported language identify it on their own
+SCRIPT_LANGUAGES: Dict[Script, int] = {}
+for script in LANGUAGE_SCRIPTS.values():
+    SCRIPT_LANGUAGES[script] = SCRIPT_LANGUAGES.get(script, 0) + 1
+
+
+def dominant_script(text: str) -> Optional[Script]:
+    """
+    Script of most of the letters of the text (None if it has no letter of a known
+    script). Japanese text counts as kana as soon as a tenth of it is kana (with
+    less kana, it counts as han like Chinese).
+    """
+    if text.isascii():
+        return Script.LATIN if ASCII_LETTER.search(text) else None
+    counts: Dict[Script, int] = {}
+    for character in text:
+        code = ord(character)
+        index = bisect_right(SCRIPT_STARTS, code) - 1
+        if index >= 0 and code <= SCRIPT_RANGES[index][1]:
+            script = SCRIPT_RANGES[index][2]
+            counts[script] = counts.get(script, 0) + 1
+    if not counts:
+        return None
+    if counts.get(Script.KANA, 0) * 10 >= sum(counts.values()):
+        return Script.KANA
+    return max(counts, key=counts.get)
+
+
+def sample_text(text: str, size: int) -> str:
+    """
+    At most `size` characters of the text, taken from its start, middle and end.
+    """
+    if len(text) <= size:
+        return text
+    third = size // 3
+    middle = (len(text) - third) // 2
+    return " ".join(
+        (text[:third], text[middle : middle + third], text[len(text) - third :])
+    )
+
+
+class LanguageDetector:
+    """
+    Language identification of the scraped texts.
+
+    The script of the text settles most verdicts without running the detector: a
+    text whose letters are mostly of another script than the one of the language
+    is rejected, and scripts written by a single supported language (Korean, Thai,
+    Hebrew, Greek, Gujarati, Japanese kana) are accepted. Otherwise the detector
+    runs on a bounded sample of the text, and its answer is cached by sample hash.
+    Han text may be Japanese written mostly in kanji: for Japanese, it is accepted
+    if it holds any kana (Chinese has none), else the detector decides.
+    """
+
+    def __init__(self, backend: str, sample_chars: int, cache_size: int):
+        self.sample_chars = sample_chars
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[bytes, Optional[str]]" = OrderedDict()
+        self.fasttext_model = None
+        if backend == "fasttext":
+            try:
+                import fasttext
+
+                self.fasttext_model = fasttext.load_model(LANGUAGE_FASTTEXT_MODEL)
+            except Exception:
+                logger.warning(
+                    "The fasttext language detector could not be loaded "
+                    f"(model: {LANGUAGE_FASTTEXT_MODEL}), using langdetect"
+                )
+
+    def is_language(self, text: str, language: LanguageSupported) -> bool:
+        sample = sample_text(text, self.sample_chars)
+        script = dominant_script(sample)
+        if script is None:
+            return False
+        if language == LanguageSupported.JA and script == Script.HAN:
+            if KANA_CHARACTER.search(sample):
+                return True
+        elif script != LANGUAGE_SCRIPTS[language]:
+            return False
+        elif SCRIPT_LANGUAGES[script] == 1:
+            return True
+        return self.detect(sample) == language.value
+
+    def detect(self, sample: str) -> Optional[str]:
+        key = hashlib.blake2b(sample.encode("utf-8"), digest_size=16).digest()
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        language = self.run_detector(sample)
+        self.cache[key] = language
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return language
+
+    def run_detector(self, sample: str) -> Optional[str]:
+        try:
+            if self.fasttext_model is not None:
+                labels, _ = self.fasttext_model.predict(sample.replace("\n", " "))
+                language = labels[0].removeprefix("__label__")
+                if language != "zh":  # langdetect tells simplified from traditional
+                    return language
+            return detect(sample)
+        except Exception:
+            return None
+
+
+language_detector = LanguageDetector(
+    LANGUAGE_DETECTOR, LANGUAGE_SAMPLE_CHARS, LANGUAGE_CACHE_SIZE
+)
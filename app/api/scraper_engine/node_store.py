@@ -0,0 +1,174 @@
+from bs4 import Tag, NavigableString
+from typing import Dict, List, Optional, Union
+from scraper_engine.image_processor import ImageProcessorMetaData
+
+
+class NodeStore:
+    """
+    Flat, array-backed storage of the scraper graph nodes.
+
+    Nodes are identified by their index, which is also their position in document
+    (pre-order) order. Every attribute lives in a parallel list so that a page costs
+    a handful of lists instead of one object per tag and text string.
+    """
+
+    __slots__ = (
+        "names",
+        "data",
+        "parents",
+        "depths",
+        "breadths",
+        "scores",
+        "text_starts",
+        "text_ends",
+        "ends",
+        "img_metadata",
+    )
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.data: List[Union[Tag, NavigableString]] = []
+        self.parents: List[int] = []
+        self.depths: List[int] = []
+        self.breadths: List[int] = []
+        self.scores: List[Union[int, float]] = []
+        self.text_starts: List[int] = []  # subtree text fragments: [start, end)
+        self.text_ends: List[int] = []
+        self.ends: List[int] = []  # subtree nodes: [index, end)
+        self.img_metadata: Dict[int, ImageProcessorMetaData] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(
+        self,
+        name: str,
+        data: Union[Tag, NavigableString],
+        parent: int,
+        depth: int,
+        breadth: int,
+        text_start: int,
+    ) -> int:
+        self.names.append(name)
+        self.data.append(data)
+        self.parents.append(parent)
+        self.depths.append(depth)
+        self.breadths.append(breadth)
+        self.scores.append(-1)
+        self.text_starts.append(text_start)
+        self.text_ends.append(text_start)
+        self.ends.append(len(self.names))
+        return len(self.names) - 1
+
+    def node(self, index: int) -> "Node":
+        return Node(self, index)
+
+    def subset(self, indexes: List[int]) -> "NodeStore":
+        """
+        Copy of the given nodes only, in the same order. The parents and descendants
+        are not part of the subset, so the copied nodes have none.
+        """
+        store = NodeStore()
+        for attribute in ("names", "data", "depths", "breadths", "scores"):
+            values = getattr(self, attribute)
+            setattr(store, attribute, [values[index] for index in indexes])
+        store.parents = [-1] * len(indexes)
+        store.ends = list(range(1, len(indexes) + 1))
+        store.text_starts = [self.text_starts[index] for index in indexes]
+        store.text_ends = [self.text_ends[index] for index in indexes]
+        store.img_metadata = {
+            position: self.img_metadata[index]
+            for position, index in enumerate(indexes)
+            if index in self.img_metadata
+        }
+        return store
+
+
+class Node:
+    """Lightweight view on a node of a NodeStore"""
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: NodeStore, index: int):
+        self.store = store
+        self.index = index
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, Node)
+            and other.store is self.store
+            and other.index == self.index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.store), self.index))
+
+    def __repr__(self) -> str:
+        return f"Node(index={self.index}, name={self.name!r}, score={self.score})"
+
+    @property
+    def name(self) -> str:
+        return self.store.names[self.index]
+
+    @property
+    def data(self) -> Union[Tag, NavigableString]:
+        return self.store.data[self.index]
+
+    @property
+    def parent(self) -> Optional["Node"]:
+        parent = self.store.parents[self.index]
+        return Node(self.store, parent) if parent >= 0 else None
+
+    @property
+    def depth(self) -> int:
+        return self.store.depths[self.index]
+
+    @property
+    def breadth(self) -> int:
+        return self.store.breadths[self.index]
+
+    @property
+    def score(self) -> Union[int, float]:
+        return self.store.scores[self.index]
+
+    @score.setter
+    def score(self, value: Union[int, float]) -> None:
+        self.store.scores[self.index] = value
+
+    @property
+    def text_start(self) -> int:
+        return self.store.text_starts[self.index]
+
+    @property
+    def text_end(self) -> int:
+        return self.store.text_ends[self.index]
+
+    @text_end.setter
+    def text_end(self, value: int) -> None:
+        self.store.text_ends[self.index] = value
+
+    @property
+    def end(self) -> int:
+        return self.store.ends[self.index]
+
+    @end.setter
+    def end(self, value: int) -> None:
+        self.store.ends[self.index] = value
+
+    def overlaps(self, other: "Node") -> bool:
+        """True if one of the nodes is the other or one of its descendants"""
+        return (
+            self.index <= other.index < self.end
+            or other.index <= self.index < other.end
+        )
+
+    @property
+    def img_metadata(self) -> Optional[ImageProcessorMetaData]:
+        return self.store.img_metadata.get(self.index)
+
+    @img_metadata.setter
+    def img_metadata(self, value: Optional[ImageProcessorMetaData]) -> None:
+        if value is None:
+            self.store.img_metadata.pop(self.index, None)
+        else:
+            self.store.img_metadata[self.index] = value
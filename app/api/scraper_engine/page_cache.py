@@ -0,0 +1,203 @@
+from collections import OrderedDict
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+
+logger = logging.getLogger("uvicorn")
+
+# Bytes of page bodies kept in memory by each worker
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", str(64 * 2**20)))
+# Directory of the on-disk tier shared by the workers (disabled if unset)
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR") or None
+# Bytes of the on-disk tier: the least recently used entries are removed beyond it
+PAGE_CACHE_DIR_MAX_BYTES = int(
+    os.environ.get("PAGE_CACHE_DIR_MAX_BYTES", str(1024 * 2**20))
+)
+# Prefix of the files being written (and of the leftovers of a crashed worker)
+TEMPORARY_PREFIX = ".tmp-"
+# Seconds after which a temporary file is a leftover
+TEMPORARY_MAX_AGE = 600
+
+
+class CachedPage(BaseModel):
+    """
+    Page body stored with the validators used to revalidate it
+    """
+
+    url: str = Field(..., title="Url of the page")
+    content: bytes = Field(..., title="Body of the page")
+    etag: Optional[str] = Field(default=None, title="ETag response header")
+    last_modified: Optional[str] = Field(
+        default=None, title="Last-Modified response header"
+    )
+    stored_at: float = Field(default_factory=time.time, title="Storage timestamp")
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    Two-tier cache of the fetched pages: a size-bounded LRU in memory, in front of
+    an optional directory shared by every uvicorn worker. Only pages returned with
+    an ETag or a Last-Modified header are stored, since they are served again only
+    after the server confirmed them with a 304 Not Modified.
+
+    The directory is kept under about `directory_max_bytes`: each worker counts the
+    bytes it writes from the size found by its last scan, and once they exceed the
+    cap, scans the directory again and removes the least recently used entries
+    (a hit refreshes the modification time of its file) down to 90% of it.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        directory: Optional[str] = None,
+        directory_max_bytes: int = PAGE_CACHE_DIR_MAX_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.directory_max_bytes = directory_max_bytes
+        self.directory_size: Optional[int] = None  # unknown until the first scan
+        self.pages: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self.size = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    async def get(self, url: str) -> Optional[CachedPage]:
+        page = self.pages.get(url)
+        if page is not None:
+            self.pages.move_to_end(url)
+            return page
+        if self.directory:
+            page = await asyncio.to_thread(self.read_file, url)
+            if page is not None:
+                self.remember(page)
+        return page
+
+    async def put(self, page: CachedPage) -> None:
+        if not (page.etag or page.last_modified):
+            return
+        self.remember(page)
+        if self.directory:
+            await asyncio.to_thread(self.write_file, page)
+
+    def remember(self, page: CachedPage) -> None:
+        if len(page.content) > self.max_bytes:
+            return
+        previous = self.pages.pop(page.url, None)
+        if previous is not None:
+            self.size -= len(previous.content)
+        self.pages[page.url] = page
+        self.size += len(page.content)
+        while self.size > self.max_bytes:
+            _, evicted = self.pages.popitem(last=False)
+            self.size -= len(evicted.content)
+
+    def path(self, url: str) -> str:
+        return os.path.join(self.directory, self.key(url))
+
+    def read_file(self, url: str) -> Optional[CachedPage]:
+        path = self.path(url)
+        try:
+            with open(path, "rb") as file:
+                header = json.loads(file.readline())
+                if header["url"] != url:
+                    return None
+                page = CachedPage(content=file.read(), **header)
+            os.utime(path)  # recently used, evicted last
+            return page
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning(f"Ignoring corrupted page cache entry for {url}")
+            return None
+
+    def write_file(self, page: CachedPage) -> None:
+        """
+        Writes the header line and the body to a temporary file renamed over the
+        entry, so that the other workers never read a partial entry.
+        """
+        header = json.dumps(page.model_dump(exclude={"content"})).encode("utf-8")
+        temporary = None
+        try:
+            fd, temporary = tempfile.mkstemp(
+                prefix=TEMPORARY_PREFIX, dir=self.directory
+            )
+            with os.fdopen(fd, "wb") as file:
+                file.write(header + b"\n")
+                file.write(page.content)
+            os.replace(temporary, self.path(page.url))
+            temporary = None
+        except Exception:
+            logger.warning(f"Could not write page cache entry for {page.url}")
+            return
+        finally:
+            if temporary is not None:
+                self.remove_file(temporary)
+        if self.directory_size is not None:
+            self.directory_size += len(header) + 1 + len(page.content)
+        if (
+            self.directory_size is None
+            or self.directory_size > self.directory_max_bytes
+        ):
+            self.prune_files()
+
+    def prune_files(self) -> None:
+        """
+        Removes the least recently used entries (and the temporary files left by a
+        crashed worker) until the directory holds 90% of `directory_max_bytes`.
+        """
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.directory) as files:
+                for file in files:
+                    try:
+                        stat = file.stat()
+                    except OSError:
+                        continue  # removed meanwhile by another worker
+                    if file.name.startswith(TEMPORARY_PREFIX):
+                        if now - stat.st_mtime >= TEMPORARY_MAX_AGE:
+                            self.remove_file(file.path)
+                    elif file.is_file():
+                        entries.append((stat.st_mtime, stat.st_size, file.path))
+        except OSError:
+            logger.warning("Could not scan the page cache directory", exc_info=True)
+            return
+        size = sum(entry[1] for entry in entries)
+        if size > self.directory_max_bytes:
+            target = self.directory_max_bytes * 0.9
+            for _, file_size, path in sorted(entries):
+                if size <= target:
+                    break
+                if self.remove_file(path):
+                    size -= file_size
+        self.directory_size = size
+
+    @staticmethod
+    def remove_file(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:  # removed meanwhile by another worker
+            return False
+
+
+page_cache = PageCache(PAGE_CACHE_MAX_BYTES, PAGE_CACHE_DIR, PAGE_CACHE_DIR_MAX_BYTES)
@@ -0,0 +1,115 @@
+from scraper_engine.page_cache import CachedPage, page_cache
+from scraper_engine import deadline
+from data.http_client import HttpClients, HttpClientName
+from typing import Dict, Tuple
+import asyncio
+import httpx
+import os
+
+
+# Bytes of a page body downloaded at most (the rest of the page is ignored)
+PAGE_MAX_BYTES = int(os.environ.get("PAGE_MAX_BYTES", str(5 * 2**20)))
+# Seconds allowed to download a whole page, on top of the connect/read timeouts
+PAGE_FETCH_TIMEOUT = float(os.environ.get("PAGE_FETCH_TIMEOUT", "20"))
+# Content types of the pages scraped (a response without Content-Type is accepted)
+PAGE_CONTENT_TYPES = [
+    content_type.strip().lower()
+    for content_type in os.environ.get(
+        "PAGE_CONTENT_TYPES", "text/html,application/xhtml+xml"
+    ).split(",")
+    if content_type.strip()
+]
+# Status codes of a host failing or asking to slow down (the other errors are
+# answers about the page)
+OVERLOAD_STATUSES = (429, 500, 502, 503, 504)
+
+
+class PageRejected(ValueError):
+    """
+    The host answered, but not with a page to scrape: an error status other than
+    `OVERLOAD_STATUSES`, or a content type other than `PAGE_CONTENT_TYPES`.
+    """
+
+
+async def fetch_page(url: str) -> Tuple[bytes, bool]:
+    """
+    Fetches the body of a page with the shared scraper client, and tells whether
+    it was truncated to `PAGE_MAX_BYTES`. A cached copy is revalidated with
+    If-None-Match / If-Modified-Since, and a 304 Not Modified answer serves it
+    without downloading the page again.
+
+    The body is streamed: the download stops after `PAGE_MAX_BYTES` bytes or
+    `PAGE_FETCH_TIMEOUT` seconds, and a page whose Content-Type is not one of
+    `PAGE_CONTENT_TYPES` is rejected before its body is read. Waiting for a
+    connection to the host and downloading are both bounded by the deadline of
+    the request, which raises `DeadlineExceeded`.
+    """
+
+    cached = await page_cache.get(url)
+    headers = cached.conditional_headers() if cached else {}
+    try:
+        status_code, response_headers, content, truncated = await deadline.wait_for(
+            download(url, headers, cached is not None)
+        )
+    except deadline.DeadlineExceeded:
+        raise
+    except asyncio.TimeoutError:
+        raise ValueError(f"Timed out fetching the website: {url}")
+
+    if status_code == 304 and cached is not None:
+        return cached.content, False
+
+    if not truncated and "no-store" not in response_headers.get("cache-control", ""):
+        await page_cache.put(
+            CachedPage(
+                url=url,
+                content=content,
+                etag=response_headers.get("etag"),
+                last_modified=response_headers.get("last-modified"),
+            )
+        )
+    return content, truncated
+
+
+async def download(
+    url: str, headers: Dict[str, str], revalidating: bool
+) -> Tuple[int, httpx.Headers, bytes, bool]:
+    async with HttpClients.host_limit(HttpClientName.SCRAPER, url):
+        return await asyncio.wait_for(
+            stream_page(url, headers, revalidating), PAGE_FETCH_TIMEOUT
+        )
+
+
+async def stream_page(
+    url: str, headers: Dict[str, str], revalidating: bool
+) -> Tuple[int, httpx.Headers, bytes, bool]:
+    """
+    Streams the body of the page: status code, headers, at most `PAGE_MAX_BYTES`
+    bytes of the body, and whether there were more.
+    """
+    client = HttpClients.get(HttpClientName.SCRAPER)
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304 and revalidating:
+            return response.status_code, response.headers, b"", False
+        if response.status_code in OVERLOAD_STATUSES:
+            raise ValueError(f"Failed to fetch the website: {url}")
+        if response.status_code != 200:
+            raise PageRejected(f"Failed to fetch the website: {url}")
+        content_type = response.headers.get("content-type", "")
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type and media_type not in PAGE_CONTENT_TYPES:
+            raise PageRejected(
+                f"Unsupported content type '{media_type}' for the website: {url}"
+            )
+
+        chunks = []
+        size = 0
+        truncated = False
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > PAGE_MAX_BYTES:
+                truncated = True
+                break
+        content = b"".join(chunks)[:PAGE_MAX_BYTES]
+        return response.status_code, response.headers, content, truncated
@@ -0,0 +1,90 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from scraper_engine import deadline
+import asyncio
+import logging
+import multiprocessing
+import os
+
+
+logger = logging.getLogger("uvicorn")
+
+# Processes parsing and scoring the pages of each uvicorn worker (0 parses them on
+# the event loop of the worker)
+SCRAPER_PROCESS_POOL_SIZE = int(os.environ.get("SCRAPER_PROCESS_POOL_SIZE", "0"))
+# Seconds allowed to parse and score a page in the process pool
+SCRAPER_PROCESS_TIMEOUT = float(os.environ.get("SCRAPER_PROCESS_TIMEOUT", "30"))
+
+
+def warm_up() -> None:
+    """
+    Imports the parsing and scoring modules, so that the first page sent to a new
+    process does not pay for them.
+    """
+    import scraper_engine.scraper_graph  # noqa: F401
+
+
+class ScraperProcessPool:
+    """
+    Per-worker pool of processes running the CPU-bound part of a scrape (HTML
+    parsing, tree scoring, language detection), so that a heavy page does not stall
+    the other requests of the event loop. The processes are started at startup (or
+    on first use) and only the compact result of a page is sent back.
+    """
+
+    _executor: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def enabled() -> bool:
+        return SCRAPER_PROCESS_POOL_SIZE > 0
+
+    @classmethod
+    def get(cls) -> ProcessPoolExecutor:
+        if cls._executor is None:
+            cls._executor = ProcessPoolExecutor(
+                max_workers=SCRAPER_PROCESS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up,
+            )
+        return cls._executor
+
+    @classmethod
+    async def run(cls, function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs `function(*args)` in the pool. Waits at most `SCRAPER_PROCESS_TIMEOUT`
+        seconds (and until the deadline of the request) for the result: a task
+        still queued is cancelled, a running one finishes in the background. The
+        pool is replaced if one of its processes died.
+        """
+        executor = cls.get()
+        loop = asyncio.get_running_loop()
+        try:
+            return await deadline.wait_for(
+                loop.run_in_executor(executor, function, *args),
+                SCRAPER_PROCESS_TIMEOUT,
+            )
+        except BrokenProcessPool:
+            logger.error("A scraper process died, restarting the process pool")
+            if cls._executor is executor:
+                cls._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    @classmethod
+    async def startup(cls) -> None:
+        if cls.enabled():
+            executor = cls.get()
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, warm_up)
+                    for _ in range(SCRAPER_PROCESS_POOL_SIZE)
+                )
+            )
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
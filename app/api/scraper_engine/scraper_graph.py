@@ -1,32 +1,40 @@
-from bs4 import BeautifulSoup, Tag, NavigableString
-from anytree import NodeMixin
-from typing import Optional, Union, Tuple
-import httpx
+from bs4 import BeautifulSoup, Tag, NavigableString, CData
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urldefrag, urljoin, urlparse
+import asyncio
+import heapq
+import logging
+import os
 from pydantic import HttpUrl
-from langdetect import detect
+from scraper_engine.html_parser import HtmlParser, parse_html
+from scraper_engine.page_fetcher import fetch_page
+from scraper_engine.process_pool import ScraperProcessPool
+from scraper_engine import deadline
+from scraper_engine.template_store import (
+    element_path,
+    path_depth,
+    resolve_path,
+    template_store,
+)
 from scraper_engine.image_processor import ImageProcessor, ImageProcessorMetaData
+from scraper_engine.node_store import Node, NodeStore
 from scraper_engine.website import Website
 from scraper_engine.language_supported import LanguageSupported
+from scraper_engine.language_detector import language_detector
 
 
-class Node(NodeMixin):
-    """Node class for the scraper graph"""
+logger = logging.getLogger("uvicorn")
 
-    def __init__(
-        self,
-        name: str,
-        data: Union[Tag, NavigableString],
-        breadth: int,
-        parent: Optional["Node"] = None,
-    ):
-        self.name = name
-        self.parent = parent
-        self.data = data
-        self.breadth = breadth
-        self.text_density = 0
-        self.tag_weight = 0
-        self.score: Union[int, float] = 0
-        self.img_metadata: Optional[ImageProcessorMetaData] = None
+# Maximum number of images fetched at the same time, and per image fetch timeout
+IMAGE_FETCH_CONCURRENCY = int(os.environ.get("IMAGE_FETCH_CONCURRENCY", "10"))
+IMAGE_FETCH_TIMEOUT = float(os.environ.get("IMAGE_FETCH_TIMEOUT", "10"))
+# Nodes and depth of the tree built for a page: the rest of the page is ignored
+SCRAPER_MAX_NODES = int(os.environ.get("SCRAPER_MAX_NODES", "100000"))
+SCRAPER_MAX_DEPTH = int(os.environ.get("SCRAPER_MAX_DEPTH", "256"))
+
+# String types collected by `Tag.get_text()` (exact type match, so comments,
+# scripts and stylesheets are left out)
+TEXT_STRING_TYPES = (NavigableString, CData)
 
 
 class ScraperGraph:
@@ -42,7 +50,16 @@ class ScraperGraph:
         soup (BeautifulSoup): The BeautifulSoup object containing the parsed HTML content.
         image_search (bool): A flag indicating whether to search for images.
         root (Node): The root node of the constructed tree.
-        best_node (Node): The node with the highest score in the tree.
+        best_node (Optional[Node]): The node with the highest score in the tree (None in a detached page without images).
+        best_nodes (List[Node]): The `k` highest scoring nodes not containing each other, by decreasing score.
+        k (int): The number of best nodes to select.
+        template_hit (bool): Whether the best node was found at the path of the learned template of the domain.
+        template_node (Optional[Node]): The 'img' node at the template path, tried first in image mode.
+        template_min_score (float): The score the node at the template path must reach to be kept.
+        store (NodeStore): Flat storage of every node of the tree, indexed in document order.
+        fragments (List[NavigableString]): The text strings of the page, in document order.
+        links (List[str]): The absolute urls of the links of the page, collected if `follow_links` is set.
+        truncated (bool): Whether a part of the page was ignored (download size, node or depth budget).
 
     Relevant Text Tags:
         A list of HTML tags considered relevant for text extraction.
@@ -51,27 +68,64 @@ class ScraperGraph:
 
 
     Methods:
-        create(url: HttpUrl, image_search: bool = False, language: LanguageSupported = LanguageSupported.EN):
-            Class method to initialize the ScraperGraph instance by fetching and parsing the webpage content.
+        create(url: HttpUrl, image_search: bool = False, language: LanguageSupported = LanguageSupported.EN, parser: Optional[HtmlParser] = None, k: int = 1, follow_links: bool = False):
+            Class method to initialize the ScraperGraph instance by fetching (or revalidating the cached copy of)
+            and parsing the webpage content with the given HTML parser backend (default from the `SCRAPER_HTML_PARSER` environment variable).
+            The page is parsed and scored in the process pool if `SCRAPER_PROCESS_POOL_SIZE` is set.
+
+        analyze(content: bytes, url: HttpUrl, image_search: bool, language: LanguageSupported, parser: Optional[HtmlParser], k: int = 1, template: Optional[str] = None, min_score: float = 0, follow_links: bool = False, detached: bool = False):
+            Class method running the CPU-bound part of 'create' (parsing, tree building, text scoring, link extraction).
+
+        detach() -> None:
+            Drops the parsed document, so that the graph is small enough to be returned by a worker process.
 
-        build_tree(element: Union[Tag, NavigableString], parent: Optional[Node] = None, depth: int = 0, best_node: Optional[Node] = None) -> Tuple[Node, Node]:
-            Recursively builds the tree structure from the HTML content, scoring nodes and tracking the best node.
+        score_tree(root: Tag, depth: int = 0) -> None:
+            Builds and scores the tree of a subtree (the whole document, or the subtree at a template path).
+
+        extract_links() -> List[str]:
+            Collects the absolute http(s) urls of the 'a' tags of the page, for the crawler.
+
+        build_tree(root: Tag, depth: int = 0) -> None:
+            Iteratively builds the tree structure from the HTML content with an explicit stack, scoring each
+            node once in post-order from the text fragments aggregated over its subtree. The tree is cut at
+            `SCRAPER_MAX_NODES` nodes and `SCRAPER_MAX_DEPTH` levels.
 
         is_language(text: str) -> bool:
-            Checks if the provided text is in the desired language.
+            Checks if the provided text is in the desired language (script check, then cached detection on a sample).
+
+        node_text(node: Node) -> str:
+            Returns the text of a node (same as `get_text(" ").strip()`) from the aggregated fragments.
 
         calculate_text_density(node: Node) -> int:
-            Calculates the density of text within a node.
+            Calculates the density of text within a node from the aggregated fragment lengths.
 
-        text_score(node: Node, node_name: str) -> int:
-            Scores a node based on its text content and tag.
+        text_score(node: Node) -> int:
+            Scores a node based on its text content and tag, assuming the text is in the desired language.
 
-        image_score(node: Node) -> float:
+        search_images() -> None:
+            Probes, scores and loads the images, starting with the image at the template path alone.
+
+        score_images(nodes: Optional[List[Node]] = None) -> None:
+            Probes the size of every candidate 'img' node concurrently, then scores them.
+
+        load_best_images() -> None:
+            Fetches the whole images of the best nodes only (the ones loaded in time once the request deadline expired).
+
+        image_score(node: Node, metadata: Optional[ImageProcessorMetaData]) -> float:
             scores a node based on its image attributes.
 
+        select_best_nodes() -> List[Node]:
+            Picks the k highest scoring non overlapping nodes from a heap, checking the language of the candidates lazily by decreasing score.
+
         get_best_node() -> Node:
             Retrieves the best node found in the tree based on the highest score.
 
+        get_best_nodes() -> List[Node]:
+            Retrieves the k best nodes, starting with the best node.
+
+        best_path() -> Optional[str]:
+            Returns the structural path of the best node, recorded in the templates of the domain.
+
     Usage:
         scraper_graph = await ScraperGraph.create(url="https://localhost/api/scaper/", image_search=False, language=LanguageSupported.EN)
         best_node = scraper_graph.get_best_node()
@@ -84,7 +138,11 @@ class ScraperGraph:
     soup: BeautifulSoup
     image_search: bool
     root: Node
-    best_node: Node
+    best_node: Optional[Node]
+    best_nodes: List[Node]
+    k: int
+    store: NodeStore
+    fragments: List[NavigableString]
 
     relevant_text_tags = [
         "h1",
@@ -120,97 +178,445 @@ class ScraperGraph:
         url: HttpUrl,
         image_search: bool = False,
         language: LanguageSupported = LanguageSupported.EN,
+        parser: Optional[HtmlParser] = None,
+        k: int = 1,
+        follow_links: bool = False,
     ):
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(str(url))
-            if response.status_code != 200:
-                raise ValueError(f"Failed to fetch the website: {url}")
-            soup = BeautifulSoup(response.content, "html.parser")
+        content, truncated = await fetch_page(str(url))
+        key = template_store.key(str(url), image_search, parser)
+        template = template_store.lookup(key) if k == 1 else None
+        path, min_score = template or (None, 0)
+        args = (content, url, image_search, language, parser, k, path, min_score)
+        if ScraperProcessPool.enabled():
+            instance = await ScraperProcessPool.run(
+                cls.analyze, *args, follow_links, True
+            )
+        else:
+            instance = cls.analyze(*args, follow_links)
+        instance.truncated = instance.truncated or truncated
+        if image_search:
+            await instance.search_images()
+        if k == 1:
+            template_store.record(
+                key,
+                instance.best_path(),
+                instance.best_node.score if instance.best_nodes else 0,
+                template is not None,
+                instance.template_hit,
+            )
+        return instance
+
+    @classmethod
+    def analyze(
+        cls,
+        content: bytes,
+        url: HttpUrl,
+        image_search: bool = False,
+        language: LanguageSupported = LanguageSupported.EN,
+        parser: Optional[HtmlParser] = None,
+        k: int = 1,
+        template: Optional[str] = None,
+        min_score: float = 0,
+        follow_links: bool = False,
+        detached: bool = False,
+    ):
+        """
+        CPU-bound part of `create`: parses the page, builds and scores the tree, and
+        in text mode selects the best nodes. With the path of a `template`, only the
+        subtree at that path is scored first, and the whole page is scored if the
+        root of the subtree does not win it or scores less than `min_score`. The links of the page are collected if
+        `follow_links` is set. A `detached` graph can be sent back from a process of
+        the pool.
+        """
 
         instance = cls.__new__(cls)
         instance.language = language
         instance.website = Website(url=url)
         instance.img_proc = ImageProcessor(instance.website.base_url)
         instance.image_search = image_search
-        instance.soup = soup
-        instance.root, instance.best_node = await instance.build_tree(soup)
+        instance.k = k
+        instance.soup = parse_html(content, parser)
+        instance.template_hit = False
+        instance.template_node = None
+        instance.template_min_score = min_score
+        element = resolve_path(instance.soup, template) if template else None
+        if element is not None and not image_search:
+            instance.score_tree(element, path_depth(template))
+            instance.template_hit = (
+                bool(instance.best_nodes)
+                and instance.best_node.index == 0
+                and instance.best_node.score >= min_score
+            )
+        if not instance.template_hit:
+            instance.score_tree(instance.soup)
+        if element is not None and image_search and element.name == "img":
+            # None if the node budget cut the image out: all the images are probed
+            instance.template_node = next(
+                (
+                    instance.store.node(index)
+                    for index, data in enumerate(instance.store.data)
+                    if data is element
+                ),
+                None,
+            )
+        instance.links = instance.extract_links() if follow_links else []
+        if detached:
+            instance.detach()
         return instance
 
-    async def build_tree(
-        self,
-        element: Union[Tag, NavigableString],
-        parent: Optional[Node] = None,
-        depth: int = 0,
-        best_node: Optional[Node] = None,
-    ) -> Tuple[Node, Node]:
-        node_name = (
-            element.name if isinstance(element, Tag) and element.name else "text"
-        )
-        node = Node(
-            node_name,
-            data=element,
-            breadth=len(list(element.children)) if isinstance(element, Tag) else 1,
-            parent=parent,
-        )
-        node.score = (
-            await self.image_score(node)
-            if self.image_search
-            else self.text_score(node, node_name)
-        )
-
-        if best_node is None or node.score > best_node.score:
-            best_node = node
-
-        if isinstance(element, Tag):
-            for child in element.children:
-                if isinstance(child, Tag) or (
-                    isinstance(child, NavigableString) and child.strip()
-                ):
-                    _, best_child = await self.build_tree(
-                        child, parent=node, depth=depth + 1, best_node=best_node
-                    )
-                    if best_child.score > best_node.score:
-                        best_node = best_child
-
-        return node, best_node
+    def score_tree(self, root: Tag, depth: int = 0) -> None:
+        """
+        Builds and scores the tree of the subtree at `root` (at `depth` in the
+        document), and in text mode selects its best nodes.
+        """
+        self.truncated = False
+        self.store = NodeStore()
+        self.fragments = []
+        self._lengths, self._leading, self._trailing = [0], [], []
+        self._filled, self._filled_count = [], [0]
+        self.build_tree(root, depth)
+        self.root = self.store.node(0)
+        if not self.image_search:
+            self.select_best_nodes()
+        else:
+            self.best_nodes, self.best_node = [], self.root
+
+    def extract_links(self) -> List[str]:
+        """
+        Absolute http(s) urls of the 'a' tags of the page (resolved against its
+        'base' tag if any), without fragment nor duplicates, in document order.
+        """
+        base = str(self.website.url)
+        base_tag = self.soup.find("base", href=True)
+        if base_tag is not None and isinstance(base_tag["href"], str):
+            base = urljoin(base, base_tag["href"].strip())
+        links: Dict[str, None] = {}
+        for tag in self.soup.find_all("a", href=True):
+            href = tag["href"]
+            if not isinstance(href, str):
+                continue
+            try:
+                link = urldefrag(urljoin(base, href.strip())).url
+                if urlparse(link).scheme in ("http", "https"):
+                    links[link] = None
+            except ValueError:  # malformed url, e.g. an invalid IPv6 host
+                continue
+        return list(links)
+
+    def detach(self) -> None:
+        """
+        Drops the parsed document, so that the graph can be sent back from another
+        process. Only the candidates are kept: the best nodes and their text in text
+        mode, the 'img' nodes with their 'src' and 'alt' attributes in image mode.
+        """
+        if self.image_search:
+            indexes = [i for i, name in enumerate(self.store.names) if name == "img"]
+            self.store = self.store.subset(indexes)
+            self.store.data = [
+                {
+                    "path": element_path(tag),
+                    **{key: tag[key] for key in ("src", "alt") if tag.has_attr(key)},
+                }
+                for tag in self.store.data
+            ]
+            self.fragments = []
+            # the best node is still the root of the parsed document: the new
+            # store has no node to point to until the images are scored
+            self.best_nodes = []
+            self.best_node = self.store.node(0) if indexes else None
+            if self.template_node is not None:
+                self.template_node = self.store.node(
+                    indexes.index(self.template_node.index)
+                )
+        else:
+            indexes = [node.index for node in self.best_nodes]
+            if not indexes:
+                indexes = [self.best_node.index]  # no node in the language
+            self.fragments = [self.node_text(self.store.node(i)) for i in indexes]
+            path = self.best_path()
+            self.store = self.store.subset(indexes)
+            self.store.data = [None] * len(indexes)
+            if path is not None:
+                self.store.data[0] = {"path": path}
+            self.store.text_starts = list(range(len(indexes)))
+            self.store.text_ends = list(range(1, len(indexes) + 1))
+            self.best_nodes = [self.store.node(i) for i in range(len(self.best_nodes))]
+            self.best_node = self.store.node(0)
+        self.soup = None
+        self.root = None
+        self._lengths, self._leading, self._trailing = [0], [], []
+        self._filled, self._filled_count = [], [0]
+
+    def build_tree(self, root: Tag, depth: int = 0) -> None:
+        """
+        Stops adding nodes once the tree has `SCRAPER_MAX_NODES` nodes, and skips
+        the elements deeper than `SCRAPER_MAX_DEPTH`: the nodes already built are
+        still scored (from the part of their subtree that was visited), and the
+        graph is flagged as `truncated`.
+        """
+        store = self.store
+        # (element, parent index, depth); a None element marks the end of the
+        # subtree of the node whose index is stored in place of the parent
+        stack: List[Tuple[Union[Tag, NavigableString, None], int, int]] = [
+            (root, -1, depth)
+        ]
+        while stack:
+            element, parent, depth = stack.pop()
+            if element is None:
+                self.leave_node(store.node(parent))
+                continue
+            if depth > SCRAPER_MAX_DEPTH:
+                self.truncated = True
+                continue
+            if len(store) >= SCRAPER_MAX_NODES:
+                self.truncated = True
+                # only close the open nodes
+                stack = [entry for entry in stack if entry[0] is None]
+                continue
+
+            is_tag = isinstance(element, Tag)
+            if is_tag or element.strip():
+                index = store.add(
+                    element.name if is_tag and element.name else "text",
+                    element,
+                    parent=parent,
+                    depth=depth,
+                    breadth=len(element.contents) if is_tag else 1,
+                    text_start=len(self.fragments),
+                )
+            if type(element) in TEXT_STRING_TYPES:
+                self.add_fragment(element)
+
+            if is_tag:
+                stack.append((None, index, 0))
+                stack.extend(
+                    (child, index, depth + 1) for child in reversed(element.contents)
+                )
+            elif element.strip():
+                self.leave_node(store.node(index))
+
+    def best_path(self) -> Optional[str]:
+        """
+        Structural path of the best node in the document, None if there is none.
+        """
+        if not self.best_nodes:
+            return None
+        data = self.best_node.data
+        return data["path"] if isinstance(data, dict) else element_path(data)
+
+    def leave_node(self, node: Node) -> None:
+        """
+        Called once the whole subtree of the node has been visited (post-order).
+        """
+        node.text_end = len(self.fragments)
+        node.end = len(self.store)
+        if not self.image_search:
+            node.score = self.text_score(node)
+
+    def select_best_nodes(self) -> List[Node]:
+        """
+        Selects the `k` highest scoring nodes, no one of them containing another one
+        (the first in document order wins a tie), and stores them in `best_nodes`.
+        The candidates are popped from a heap by decreasing score, so only the few
+        nodes reaching the top pay for the checks: in text mode the scores are upper
+        bounds until `is_language` confirms them, and in image mode an image already
+        selected from another node is skipped.
+
+        `best_node` is the first of them, or the first node with the highest
+        (negative) score if there is none, for `get_best_node` to report.
+        """
+        scores = self.store.scores
+        heap = [(-score, index) for index, score in enumerate(scores) if score > 0]
+        heapq.heapify(heap)
+        selected: List[Node] = []
+        image_urls = set()
+        while heap and len(selected) < self.k:
+            _, index = heapq.heappop(heap)
+            node = self.store.node(index)
+            if any(node.overlaps(other) for other in selected):
+                continue
+            if self.image_search:
+                if node.img_metadata.url in image_urls:
+                    continue
+                image_urls.add(node.img_metadata.url)
+            elif not self.is_language(self.node_text(node)):
+                scores[index] = -1  # not in the desired language
+                continue
+            selected.append(node)
+        self.best_nodes = selected
+        if selected:
+            self.best_node = selected[0]
+        elif scores:
+            self.best_node = self.store.node(
+                max(range(len(scores)), key=lambda index: (scores[index], -index))
+            )
+        else:
+            self.best_node = None  # detached page without any image
+        return selected
 
     def is_language(self, text: str) -> bool:
-        try:
-            return detect(text) == self.language.value  # default is "en" for English
-        except Exception:
-            return False
+        return language_detector.is_language(text, self.language)
+
+    def node_text(self, node: Node) -> str:
+        start, end = node.text_start, node.text_end
+        return " ".join(self.fragments[start:end]).strip()
+
+    def add_fragment(self, fragment: NavigableString) -> None:
+        """
+        Appends a text fragment (in document order) and updates the prefix sums of
+        the lengths and of the non blank fragments used by `calculate_text_density`.
+        """
+        index = len(self.fragments)
+        self.fragments.append(fragment)
+        self._lengths.append(self._lengths[-1] + len(fragment))
+        self._leading.append(len(fragment) - len(fragment.lstrip()))
+        self._trailing.append(len(fragment) - len(fragment.rstrip()))
+        if self._leading[-1] < len(fragment):
+            self._filled.append(index)
+        self._filled_count.append(len(self._filled))
 
     def calculate_text_density(self, node: Node) -> int:
-        text = node.data.get_text(" ").strip() if node.data else ""
-        return len(text) if self.is_language(text) else -1
+        """
+        Length of `node_text(node)`, computed from the prefix sums so that nested
+        nodes never re-walk their subtree.
+        """
+        start, end = node.text_start, node.text_end
+        if self._filled_count[end] == self._filled_count[start]:
+            return 0  # empty or whitespace only
+        first = self._filled[self._filled_count[start]]
+        last = self._filled[self._filled_count[end] - 1]
+        return (
+            self._lengths[last + 1]
+            - self._lengths[first]
+            + (last - first)  # one separator between each fragment
+            - self._leading[first]
+            - self._trailing[last]
+        )
 
-    def text_score(self, node: Node, node_name: str) -> int:
-        if node_name not in ScraperGraph.relevant_text_tags:
+    def text_score(self, node: Node) -> int:
+        if node.name not in ScraperGraph.relevant_text_tags:
             return -1
-        node.text_density = self.calculate_text_density(node)
-        if node.text_density <= 0:
-            return -1  # not in the desired language or empty
-        return node.depth * node.breadth * node.text_density
-
-    async def image_score(self, node: Node) -> float:
-        if isinstance(node.data, Tag) and node.name == "img":
-            alt_text = node.data.get("alt", "")
-            alt_text_density = len(alt_text) if isinstance(alt_text, str) else 1
+        text_density = self.calculate_text_density(node)
+        if text_density <= 0:
+            return -1  # empty
+        return node.depth * node.breadth * text_density
+
+    async def search_images(self) -> None:
+        """
+        Probes, scores and loads the candidate images. The image at the template
+        path is tried alone first, the other ones are probed only if it fails.
+        """
+        if self.template_node is not None:
+            await self.score_images([self.template_node])
+            self.select_best_nodes()
+            await self.load_best_images()
+            self.template_hit = (
+                bool(self.best_nodes)
+                and self.best_node.score >= self.template_min_score
+            )
+            if self.template_hit:
+                return
+        await self.score_images(
+            [node for node in self.image_nodes() if node != self.template_node]
+        )
+        self.select_best_nodes()
+        await self.load_best_images()
+
+    def image_nodes(self) -> List[Node]:
+        return [
+            self.store.node(index)
+            for index, name in enumerate(self.store.names)
+            if name == "img"
+        ]
+
+    async def score_images(self, nodes: Optional[List[Node]] = None) -> None:
+        """
+        Collects the candidate 'img' nodes (all of them by default), probes their
+        size concurrently (at most `IMAGE_FETCH_CONCURRENCY` at a time, each within
+        `IMAGE_FETCH_TIMEOUT` seconds, once per distinct source) and scores them
+        when the results arrive. With a request deadline, the probes get half of
+        the time left (the others score as failed), keeping the rest for loading
+        the chosen images.
+        """
+        candidates: Dict[str, List[Node]] = {}
+        for node in self.image_nodes() if nodes is None else nodes:
             src = node.data.get("src", "")
-            if not src or not isinstance(src, str):
-                return -1.0
-            metadata = await self.img_proc.get_image_size(src)
-            size_score = metadata.size[0] * metadata.size[1]  # height * width
-            if size_score == 0:
-                return -1.0
-            node.img_metadata = metadata
-            return (alt_text_density + size_score) / (node.depth + 1)
-        else:
+            if src and isinstance(src, str):
+                candidates.setdefault(src, []).append(node)
+
+        semaphore = asyncio.Semaphore(IMAGE_FETCH_CONCURRENCY)
+
+        async def fetch(src: str) -> Optional[ImageProcessorMetaData]:
+            async with semaphore:
+                try:
+                    return await deadline.wait_for(
+                        self.img_proc.get_image_size(src), IMAGE_FETCH_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Timed out retrieving image from {src}")
+                    return None
+
+        left = deadline.remaining()
+        with deadline.deadline(None if left is None else left / 2):
+            results = await asyncio.gather(*(fetch(src) for src in candidates))
+        for nodes, metadata in zip(candidates.values(), results):
+            for node in nodes:
+                node.score = self.image_score(node, metadata)
+
+    async def load_best_images(self) -> None:
+        """
+        Fetches the whole images of the best nodes. A candidate whose image cannot
+        be retrieved is discarded and the selection is made again without it.
+
+        Once the deadline of the request expired, the best nodes are the ones whose
+        image was loaded in time (`DeadlineExceeded` if there is none).
+        """
+        while True:
+            missing = [n for n in self.best_nodes if not n.img_metadata.img_base64]
+            if not missing:
+                return
+            results = await asyncio.gather(*(self.load_image(n) for n in missing))
+            for node, metadata in zip(missing, results):
+                if metadata.img_base64:
+                    node.img_metadata = metadata
+                else:
+                    node.score = -1
+                    node.img_metadata = None
+            if deadline.expired():
+                self.best_nodes = [n for n in self.best_nodes if n.img_metadata]
+                if not self.best_nodes:
+                    raise deadline.DeadlineExceeded(
+                        f"No image loaded before the deadline (url: {self.website.url})"
+                    )
+                self.best_node = self.best_nodes[0]
+                return
+            self.select_best_nodes()
+
+    async def load_image(self, node: Node) -> ImageProcessorMetaData:
+        try:
+            return await deadline.wait_for(
+                self.img_proc.load_image(node.img_metadata), IMAGE_FETCH_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out retrieving image from {node.img_metadata.url}")
+            return node.img_metadata
+
+    def image_score(
+        self, node: Node, metadata: Optional[ImageProcessorMetaData]
+    ) -> float:
+        if node.data is None or node.name != "img" or metadata is None:
+            return -1.0
+        alt_text = node.data.get("alt", "")
+        alt_text_density = len(alt_text) if isinstance(alt_text, str) else 1
+        size_score = metadata.size[0] * metadata.size[1]  # height * width
+        if size_score == 0:
             return -1.0
+        node.img_metadata = metadata
+        return (alt_text_density + size_score) / (node.depth + 1)
 
     def get_best_node(self) -> Node:
-        if self.image_search and self.best_node.score < 0:
+        if self.image_search and (self.best_node is None or self.best_node.score < 0):
             raise ScraperGraph.NoFound(
                 f"No image found on the webpage (url: {self.website.url}).\n"
                 "Only 'img' tag is considered.\n"
@@ -224,3 +630,7 @@ class ScraperGraph:
             )
         else:
             return self.best_node
+
+    def get_best_nodes(self) -> List[Node]:
+        self.get_best_node()
+        return self.best_nodes
@@ -0,0 +1,107 @@
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional, Tuple
+from xml.etree import ElementTree
+import asyncio
+import cairosvg
+import hashlib
+import os
+import re
+
+
+# Bytes of SVG renderings (PNG) cached by each worker, keyed by the hash of the SVG
+SVG_RENDER_CACHE_BYTES = int(os.environ.get("SVG_RENDER_CACHE_BYTES", str(16 * 2**20)))
+
+# Pixels per unit of the SVG lengths (96 dpi and 16px font size, as cairosvg)
+SVG_UNITS = {
+    "": 1.0,
+    "px": 1.0,
+    "pt": 4 / 3,
+    "pc": 16.0,
+    "mm": 96 / 25.4,
+    "cm": 96 / 2.54,
+    "in": 96.0,
+    "em": 16.0,
+    "ex": 8.0,
+}
+SVG_LENGTH = re.compile(r"([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)([a-z]*)")
+
+
+def svg_length(value: Optional[str]) -> Optional[float]:
+    """
+    Length in pixels of an SVG length ('12', '12px', '1.5in'...), None if it is
+    missing or relative to the viewport ('100%').
+    """
+    match = SVG_LENGTH.fullmatch((value or "").strip().lower())
+    if match is None or match.group(2) not in SVG_UNITS:
+        return None
+    return float(match.group(1)) * SVG_UNITS[match.group(2)]
+
+
+def svg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Size in pixels of an SVG image, read from the 'width', 'height' and 'viewBox'
+    attributes of its root element without rendering it. A missing dimension
+    follows the aspect ratio of the viewBox, and the viewBox gives both when none
+    is set. Returns None when the attributes do not tell the size.
+    """
+    try:
+        _, root = next(ElementTree.iterparse(BytesIO(data), events=("start",)))
+    except (ElementTree.ParseError, StopIteration):
+        return None
+    if root.tag.rsplit("}", 1)[-1] != "svg":
+        return None
+    width, height = svg_length(root.get("width")), svg_length(root.get("height"))
+    try:
+        view_box = [
+            float(v) for v in re.split(r"[\s,]+", root.get("viewBox", "").strip())
+        ]
+    except ValueError:
+        view_box = []
+    if len(view_box) == 4 and view_box[2] > 0 and view_box[3] > 0:
+        if width is None and height is None:
+            width, height = view_box[2], view_box[3]
+        elif width is None:
+            width = height * view_box[2] / view_box[3]
+        elif height is None:
+            height = width * view_box[3] / view_box[2]
+    if width is None or height is None:
+        return None
+    return round(width), round(height)
+
+
+class SvgRenderCache:
+    """
+    Size-bounded LRU of the PNG renderings of SVG images, keyed by the hash of the
+    SVG, so that a logo or an icon shared by many pages is rendered once. The
+    rendering runs in a thread, off the event loop.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.images: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self.size = 0
+
+    async def render(self, data: bytes) -> bytes:
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        png_data = self.images.get(key)
+        if png_data is not None:
+            self.images.move_to_end(key)
+            return png_data
+        png_data = await asyncio.to_thread(cairosvg.svg2png, bytestring=data)
+        if not png_data:
+            raise ValueError("Could not convert SVG to PNG")
+        self.remember(key, png_data)
+        return png_data
+
+    def remember(self, key: bytes, png_data: bytes) -> None:
+        if len(png_data) > self.max_bytes or key in self.images:
+            return
+        self.images[key] = png_data
+        self.size += len(png_data)
+        while self.size > self.max_bytes:
+            _, evicted = self.images.popitem(last=False)
+            self.size -= len(evicted)
+
+
+svg_render_cache = SvgRenderCache(SVG_RENDER_CACHE_BYTES)
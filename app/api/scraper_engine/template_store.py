@@ -0,0 +1,190 @@
+from bs4 import BeautifulSoup, Tag
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+from models.stats_model import TemplateStats, TemplateStatsResponse
+from scraper_engine.html_parser import DEFAULT_HTML_PARSER, HtmlParser
+import os
+
+
+# Scrapes of a domain electing the same node path before it is used as a template
+# (0 disables the templates)
+SCRAPER_TEMPLATE_CONFIRMATIONS = int(
+    os.environ.get("SCRAPER_TEMPLATE_CONFIRMATIONS", "3")
+)
+# Domains (per mode and parser) whose template is remembered by each process
+SCRAPER_TEMPLATE_MAX_DOMAINS = int(
+    os.environ.get("SCRAPER_TEMPLATE_MAX_DOMAINS", "1000")
+)
+# Share of its lowest confirmed score the node at the template path must reach to be
+# kept, else the whole page is scored (a short paragraph at the usual path of the
+# articles does not win)
+SCRAPER_TEMPLATE_MIN_SCORE_RATIO = float(
+    os.environ.get("SCRAPER_TEMPLATE_MIN_SCORE_RATIO", "0.5")
+)
+# Every n-th scrape of a domain with a template scores the whole page anyway, to
+# check that the template still elects the best node (0 never)
+SCRAPER_TEMPLATE_AUDIT_INTERVAL = int(
+    os.environ.get("SCRAPER_TEMPLATE_AUDIT_INTERVAL", "20")
+)
+
+
+def element_path(element: Tag) -> str:
+    """
+    Structural path of the element from the document root, e.g.
+    'html[0]/body[0]/div[2]/p[0]' for the first 'p' of the third 'div' of 'body'.
+    """
+    steps = []
+    while element.parent is not None:  # the BeautifulSoup object has no parent
+        index = sum(
+            1
+            for sibling in element.previous_siblings
+            if isinstance(sibling, Tag) and sibling.name == element.name
+        )
+        steps.append(f"{element.name}[{index}]")
+        element = element.parent
+    return "/".join(reversed(steps))
+
+
+def resolve_path(soup: BeautifulSoup, path: str) -> Optional[Tag]:
+    """
+    Element of the document at the path returned by `element_path`, if any.
+    """
+    element = soup
+    for step in path.split("/"):
+        name, _, index = step[:-1].partition("[")
+        index = int(index)
+        for child in element.children:
+            if isinstance(child, Tag) and child.name == name:
+                if index == 0:
+                    element = child
+                    break
+                index -= 1
+        else:
+            return None
+    return element
+
+
+def path_depth(path: str) -> int:
+    """Depth in the scraper graph of the element at the path"""
+    return path.count("/") + 1
+
+
+class TemplateStore:
+    """
+    Per-process memory of the extraction templates. Pages of a site usually have
+    their best node at the same structural path: once `min_confirmations` full
+    scrapes of a domain in a row elected the same path, the next pages only score
+    the subtree at that path, and fall back to the whole page if it does not win
+    or scores less than `min_score_ratio` times the lowest score the path had on
+    the pages electing it. Every `audit_interval`-th page is scored whole anyway. A
+    full scrape electing another path replaces the template.
+    """
+
+    def __init__(
+        self,
+        min_confirmations: int,
+        max_domains: int,
+        min_score_ratio: float = SCRAPER_TEMPLATE_MIN_SCORE_RATIO,
+        audit_interval: int = SCRAPER_TEMPLATE_AUDIT_INTERVAL,
+    ):
+        self.min_confirmations = min_confirmations
+        self.max_domains = max_domains
+        self.min_score_ratio = min_score_ratio
+        self.audit_interval = audit_interval
+        self.templates: "OrderedDict[tuple, TemplateStats]" = OrderedDict()
+        self.hits = 0
+        self.fallbacks = 0
+        self.misses = 0
+        self.audits = 0
+
+    @staticmethod
+    def key(url: str, image_search: bool, parser: Optional[HtmlParser]) -> tuple:
+        domain = (urlparse(url).hostname or "").lower()
+        return domain, image_search, parser or DEFAULT_HTML_PARSER
+
+    def lookup(self, key: tuple) -> Optional[Tuple[str, float]]:
+        """
+        Path of the confirmed template of the domain and the score its node must
+        reach, if any (None as well when the scrape is an audit).
+        """
+        template = self.templates.get(key)
+        if (
+            self.min_confirmations <= 0
+            or template is None
+            or template.confirmations < self.min_confirmations
+        ):
+            return None
+        self.templates.move_to_end(key)
+        template.uses += 1
+        if self.audit_interval > 0 and template.uses % self.audit_interval == 0:
+            self.audits += 1
+            template.audits += 1
+            return None
+        return template.path, template.score * self.min_score_ratio
+
+    def record(
+        self,
+        key: tuple,
+        path: Optional[str],
+        score: float,
+        used: bool,
+        hit: bool,
+    ) -> None:
+        """
+        Records the outcome of a scrape: whether the template was `used` and was a
+        `hit`, and the `path` and `score` of the best node found (None if there is
+        none).
+        """
+        if self.min_confirmations <= 0:
+            return
+        template = self.templates.get(key)
+        used = used and template is not None  # unless evicted in the meantime
+        if used:
+            if hit:
+                self.hits += 1
+                template.hits += 1
+                return
+            self.fallbacks += 1
+            template.fallbacks += 1
+        else:
+            self.misses += 1
+        if path is None:
+            return
+        if template is not None and template.path == path:
+            template.confirmations += 1
+            template.score = min(template.score, score)
+        elif template is not None:
+            template.path, template.score, template.confirmations = path, score, 1
+        else:
+            domain, image_search, parser = key
+            self.templates[key] = TemplateStats(
+                domain=domain,
+                image_search=image_search,
+                parser=parser,
+                path=path,
+                score=score,
+            )
+            if len(self.templates) > self.max_domains:
+                self.templates.popitem(last=False)
+        self.templates.move_to_end(key)
+
+    def stats(self) -> TemplateStatsResponse:
+        templates: List[TemplateStats] = [
+            template.model_copy(
+                update={"active": template.confirmations >= self.min_confirmations}
+            )
+            for template in self.templates.values()
+        ]
+        return TemplateStatsResponse(
+            hits=self.hits,
+            fallbacks=self.fallbacks,
+            misses=self.misses,
+            audits=self.audits,
+            templates=templates,
+        )
+
+
+template_store = TemplateStore(
+    SCRAPER_TEMPLATE_CONFIRMATIONS, SCRAPER_TEMPLATE_MAX_DOMAINS
+)
@@ -1,5 +1,5 @@
 from pydantic import HttpUrl, BaseModel, Field
-from urllib.parse import urlparse, urlunparse
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
 
 class Website(BaseModel):
@@ -13,3 +13,20 @@ class Website(BaseModel):
         """Compute and return the base URL from the full URL."""
         parsed_url = urlparse(str(self.url))
         return urlunparse((parsed_url.scheme, parsed_url.netloc, "", "", "", ""))
+
+    @property
+    def normalized_url(self) -> str:
+        """
+        Canonical form of the URL, used as a cache key: lowercase scheme and host,
+        no default port, no fragment, sorted query parameters.
+        """
+        parsed_url = urlparse(str(self.url))
+        scheme = parsed_url.scheme.lower()
+        netloc = (parsed_url.hostname or "").lower()
+        if parsed_url.port and (scheme, parsed_url.port) not in (
+            ("http", 80),
+            ("https", 443),
+        ):
+            netloc += f":{parsed_url.port}"
+        query = urlencode(sorted(parse_qsl(parsed_url.query, keep_blank_values=True)))
+        return urlunparse((scheme, netloc, parsed_url.path or "/", "", query, ""))
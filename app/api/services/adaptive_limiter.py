@@ -0,0 +1,59 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Tuple, Type
+import asyncio
+import time
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit adapting to the responses of a host (additive increase,
+    multiplicative decrease): a fast success raises the limit by one request per
+    limit's worth of successes, an error or a response slower than `slow` seconds
+    halves it. The limit stays between 1 and `maximum` requests in flight. The
+    `answered` errors are answers of the host (e.g. a page not found), they count
+    as responses.
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        maximum: float,
+        slow: float,
+        answered: Tuple[Type[Exception], ...] = (),
+    ):
+        self.maximum = max(1.0, maximum)
+        self.limit = min(max(1.0, initial), self.maximum)
+        self.slow = slow
+        self.answered = answered
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        start = time.monotonic()
+        failed = False
+        try:
+            yield
+        except asyncio.CancelledError:
+            failed = None  # says nothing about the host
+            raise
+        except self.answered:
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            async with self.condition:
+                self.in_flight -= 1
+                if failed is not None:
+                    self.update(failed or time.monotonic() - start > self.slow)
+                self.condition.notify_all()
+
+    def update(self, backoff: bool) -> None:
+        if backoff:
+            self.limit = max(1.0, self.limit / 2)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
@@ -0,0 +1,312 @@
+from models.sample_model import Sample, SampleEmbedding, SampleType
+from services.image_store_service import ImageStoreService
+from services.micro_batcher import MicroBatcher
+from services.embedding_cache import EmbeddingCache, embedding_cache
+from data.http_client import HttpClients, HttpClientName
+from models.stats_model import MicroBatcherStats
+from pymongo import UpdateOne
+from collections import deque
+from contextlib import aclosing
+from functools import partial
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set
+import asyncio
+import base64
+import hashlib
+import httpx
+import logging
+import json
+import os
+
+
+logger = logging.getLogger("uvicorn")
+
+# Model served by CLIP_INFERENCE_API, stored with the embeddings: the embeddings
+# of another model are computed again
+CLIP_MODEL = os.environ.get(
+    "CLIP_MODEL", "sentence-transformers-clip-ViT-B-32-multilingual-v1"
+)
+# Contents sent to CLIP_INFERENCE_API per request, and requests sent at the same time
+CLIP_BATCH_SIZE = int(os.environ.get("CLIP_BATCH_SIZE", "32"))
+CLIP_CONCURRENCY = int(os.environ.get("CLIP_CONCURRENCY", "4"))
+# Retries of a request failing with a transient error, the first one after
+# CLIP_RETRY_BACKOFF seconds and each next one twice as late
+CLIP_MAX_RETRIES = int(os.environ.get("CLIP_MAX_RETRIES", "3"))
+CLIP_RETRY_BACKOFF = float(os.environ.get("CLIP_RETRY_BACKOFF", "0.5"))
+CLIP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Single contents (new samples) embedded at the same time are sent together: a
+# batch is sent once it holds CLIP_MICROBATCH_MAX_SIZE contents, or
+# CLIP_MICROBATCH_WINDOW seconds after its first one (longer: larger batches,
+# shorter: less wait)
+CLIP_MICROBATCH_MAX_SIZE = int(
+    os.environ.get("CLIP_MICROBATCH_MAX_SIZE", str(CLIP_BATCH_SIZE))
+)
+CLIP_MICROBATCH_WINDOW = float(os.environ.get("CLIP_MICROBATCH_WINDOW", "0.02"))
+# Compute the embedding of a sample as soon as it is stored (else on first use)
+EMBEDDING_ON_INSERT = os.environ.get("EMBEDDING_ON_INSERT", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+class ClipService:
+    """
+    Embeddings of the samples by the CLIP inference sidecar. They are computed
+    once and stored in the samples (`Sample.embedding`), and in the embedding
+    cache for the other samples of the same content.
+    """
+
+    _pending: Set[asyncio.Task] = set()
+    _batchers: Dict[SampleType, MicroBatcher[str, List[float]]] = {}
+
+    @staticmethod
+    async def vectorize(
+        type: SampleType,
+        contents: List[str],
+        batch_size: int = CLIP_BATCH_SIZE,
+        concurrency: int = CLIP_CONCURRENCY,
+    ) -> AsyncIterator[List[List[float]]]:
+        """
+        Embeddings of texts, or of base64 images, yielded batch by batch in the
+        order of `contents`. Up to `concurrency` batches of `batch_size` contents
+        are sent at the same time, and no batch is sent past them until the
+        oldest one is consumed.
+        """
+        batch_size, concurrency = max(1, batch_size), max(1, concurrency)
+        pending: Deque[asyncio.Task] = deque()
+        try:
+            for start in range(0, len(contents), batch_size):
+                batch = contents[start : start + batch_size]
+                pending.append(
+                    asyncio.create_task(ClipService.vectorize_batch(type, batch))
+                )
+                if len(pending) >= concurrency:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    @staticmethod
+    async def vectorize_batch(
+        type: SampleType, contents: List[str]
+    ) -> List[List[float]]:
+        """
+        Embeddings of a batch of contents. A connection error, a timeout or a
+        transient status (`CLIP_RETRY_STATUSES`) is retried `CLIP_MAX_RETRIES`
+        times, `CLIP_RETRY_BACKOFF` seconds later, then twice as late each time.
+        """
+        if type == SampleType.TEXT:
+            clip_key, payload = "textVectors", {"texts": contents, "images": []}
+        else:
+            clip_key, payload = "imageVectors", {"texts": [], "images": contents}
+        url = f'{os.environ["CLIP_INFERENCE_API"]}/vectorize'
+        headers = {"accept": "application/json", "Content-Type": "application/json"}
+        content = json.dumps(payload)
+
+        client = HttpClients.get(HttpClientName.CLIP)
+        for attempt in range(CLIP_MAX_RETRIES + 1):
+            try:
+                response = await client.post(url, headers=headers, content=content)
+            except httpx.TransportError as e:
+                error = e.__class__.__name__
+            else:
+                if response.status_code == 200:
+                    vectors = response.json().get(clip_key, [])
+                    if len(vectors) != len(contents):
+                        raise ValueError("Number of vectors and contents do not match.")
+                    return vectors
+                if response.status_code not in CLIP_RETRY_STATUSES:
+                    raise ValueError(
+                        f"Failed to get embeddings (status {response.status_code})"
+                    )
+                error = f"status {response.status_code}"
+            if attempt < CLIP_MAX_RETRIES:
+                delay = CLIP_RETRY_BACKOFF * 2**attempt
+                logger.warning(f"CLIP request failed ({error}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+        raise ValueError(
+            f"Failed to get embeddings after {CLIP_MAX_RETRIES + 1} tries ({error})"
+        )
+
+    @classmethod
+    def batcher(cls, type: SampleType) -> MicroBatcher[str, List[float]]:
+        if type not in cls._batchers:
+            cls._batchers[type] = MicroBatcher(
+                partial(cls.vectorize_batch, type),
+                max_size=CLIP_MICROBATCH_MAX_SIZE,
+                window=CLIP_MICROBATCH_WINDOW,
+                max_in_flight=CLIP_CONCURRENCY,
+            )
+        return cls._batchers[type]
+
+    @classmethod
+    async def embed(cls, type: SampleType, content: str) -> List[float]:
+        """
+        Embedding of a text or a base64 image, sent in one request with the
+        contents other callers embed at the same time.
+        """
+        return await cls.batcher(type).submit(content)
+
+    @classmethod
+    def batch_stats(cls) -> List[MicroBatcherStats]:
+        return [cls.batcher(type).stats(type.value) for type in SampleType]
+
+    @staticmethod
+    async def contents(type: SampleType, samples: List[Sample]) -> List[Optional[str]]:
+        """
+        Texts, or base64 images (read from the image store), of the samples. The
+        content of a sample whose image is missing from the store is None.
+        """
+        if type == SampleType.TEXT:
+            return [sample.metadata.content for sample in samples]
+        images = await ImageStoreService.get_base64(
+            [s.metadata.image_id for s in samples if s.metadata.image_id]
+        )
+        contents = []
+        for sample in samples:
+            image_id = sample.metadata.image_id
+            if image_id and image_id not in images:
+                logger.warning(
+                    f"Image '{image_id}' of sample '{sample.id}' is missing from "
+                    "the image store, the sample is not embedded"
+                )
+            contents.append(
+                images.get(image_id) if image_id else sample.metadata.content
+            )
+        return contents
+
+    @staticmethod
+    def cache_key(type: SampleType, sample: Sample) -> str:
+        """
+        Key of the embedding of the sample content in the embedding cache: the
+        hash of the text, or of the image bytes (their key in the image store).
+        """
+        if type == SampleType.TEXT:
+            content_hash = hashlib.sha256(sample.metadata.content.encode()).hexdigest()
+        elif sample.metadata.image_id:
+            content_hash = sample.metadata.image_id
+        else:
+            content_hash = ImageStoreService.key(
+                base64.b64decode(sample.metadata.content)
+            )
+        return EmbeddingCache.key(CLIP_MODEL, type, content_hash)
+
+    @staticmethod
+    async def embed_samples(
+        type: SampleType, samples: List[Sample]
+    ) -> List[Optional[List[float]]]:
+        """
+        Embeddings of the samples, in their order. The stored embeddings of
+        `CLIP_MODEL` are read back, then the embedding cache gives those of the
+        contents already embedded. Only the other contents, each once, are sent
+        to the sidecar by batches, and their embeddings are cached and stored in
+        their samples as the batches come back. The embedding of a sample whose
+        image is missing from the image store is None.
+        """
+
+        missing = [
+            sample
+            for sample in samples
+            if sample.embedding is None or sample.embedding.model != CLIP_MODEL
+        ]
+        if missing:
+            keys = [ClipService.cache_key(type, sample) for sample in missing]
+            cached = await embedding_cache.get_many(keys)
+            uncached: Dict[str, List[Sample]] = {}
+            hits = []
+            for sample, key in zip(missing, keys):
+                if key in cached:
+                    sample.embedding = SampleEmbedding(
+                        model=CLIP_MODEL, vector=cached[key]
+                    )
+                    hits.append(sample)
+                else:
+                    uncached.setdefault(key, []).append(sample)
+            if hits:
+                await ClipService.store(hits)
+
+            keys = list(uncached)
+            contents = await ClipService.contents(
+                type, [uncached[key][0] for key in keys]
+            )
+            keys = [key for key, content in zip(keys, contents) if content is not None]
+            contents = [content for content in contents if content is not None]
+            done = 0
+            async with aclosing(ClipService.vectorize(type, contents)) as batches:
+                async for vectors in batches:
+                    batch, embedded = {}, []
+                    for key, vector in zip(keys[done : done + len(vectors)], vectors):
+                        embedding = SampleEmbedding.from_vector(CLIP_MODEL, vector)
+                        batch[key] = embedding.vector
+                        for sample in uncached[key]:
+                            sample.embedding = embedding
+                            embedded.append(sample)
+                    await embedding_cache.put_many(batch)
+                    await ClipService.store(embedded)
+                    done += len(vectors)
+        return [
+            (
+                sample.embedding.to_vector()
+                if sample.embedding is not None and sample.embedding.model == CLIP_MODEL
+                else None
+            )
+            for sample in samples
+        ]
+
+    @staticmethod
+    async def store(samples: List[Sample]) -> None:
+        """
+        Stores the embeddings of the samples. A failure is only logged: the
+        embeddings are computed again on their next use.
+        """
+        try:
+            await Sample.get_motor_collection().bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": sample.id},
+                        {"$set": {"embedding": sample.embedding.model_dump()}},
+                    )
+                    for sample in samples
+                ],
+                ordered=False,
+            )
+        except Exception:
+            logger.warning("Failed to store the embeddings", exc_info=True)
+
+    @classmethod
+    def embed_later(cls, sample: Sample) -> None:
+        """
+        Computes and stores the embedding of a new sample in the background (if
+        `EMBEDDING_ON_INSERT`), so that storing it does not wait for the sidecar.
+        The samples stored at the same time are embedded in one request.
+        """
+        if not EMBEDDING_ON_INSERT:
+            return
+        task = asyncio.create_task(cls.embed_new_sample(sample))
+        cls._pending.add(task)
+        task.add_done_callback(cls._pending.discard)
+
+    @staticmethod
+    async def embed_new_sample(sample: Sample) -> None:
+        try:
+            type = sample.metadata.type
+            key = ClipService.cache_key(type, sample)
+            cached = await embedding_cache.get_many([key])
+            if key in cached:
+                sample.embedding = SampleEmbedding(model=CLIP_MODEL, vector=cached[key])
+            else:
+                (content,) = await ClipService.contents(type, [sample])
+                if content is None:
+                    return
+                vector = await ClipService.embed(type, content)
+                sample.embedding = SampleEmbedding.from_vector(CLIP_MODEL, vector)
+                await embedding_cache.put_many({key: sample.embedding.vector})
+            await ClipService.store([sample])
+        except Exception:
+            logger.warning(
+                f"Failed to embed sample '{sample.id}', it will be embedded on use",
+                exc_info=True,
+            )
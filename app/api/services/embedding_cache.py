@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from models.embedding_model import CachedEmbedding, EMBEDDING_CACHE_MAX_BYTES
+from models.sample_model import SampleType
+from models.stats_model import EmbeddingCacheStats
+from beanie.operators import In
+from pymongo import UpdateOne
+from datetime import datetime, timezone
+from typing import Dict, List
+import logging
+
+
+logger = logging.getLogger("uvicorn")
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of the embeddings, keyed by the model, the type and the hash of
+    the content: a size-bounded LRU in memory, in front of a Mongo collection
+    shared by every uvicorn worker. The same logo or boilerplate paragraph found
+    on many pages is embedded once. A failure of the Mongo tier counts as a miss.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.vectors: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size = 0
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, type: SampleType, content_hash: str) -> str:
+        return f"{model}:{type.value}:{content_hash}"
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Cached embeddings of the keys (the missing keys are left out)"""
+        found = {}
+        for key in keys:
+            vector = self.vectors.get(key)
+            if vector is not None:
+                self.vectors.move_to_end(key)
+                found[key] = vector
+        self.memory_hits += len(found)
+        missing = list({key for key in keys if key not in found})
+        if missing:
+            try:
+                entries = await CachedEmbedding.find(
+                    In(CachedEmbedding.id, missing)
+                ).to_list()
+            except Exception:
+                logger.warning("Failed to read the embedding cache", exc_info=True)
+                entries = []
+            for entry in entries:
+                vector = bytes(entry.vector)
+                self.remember(entry.id, vector)
+                found[entry.id] = vector
+            self.store_hits += len(entries)
+            self.misses += len(missing) - len(entries)
+        return found
+
+    async def put_many(self, vectors: Dict[str, bytes]) -> None:
+        for key, vector in vectors.items():
+            self.remember(key, vector)
+        if not vectors:
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            await CachedEmbedding.get_motor_collection().bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": key},
+                        {"$setOnInsert": {"vector": vector, "created_at": now}},
+                        upsert=True,
+                    )
+                    for key, vector in vectors.items()
+                ],
+                ordered=False,
+            )
+        except Exception:
+            logger.warning("Failed to write the embedding cache", exc_info=True)
+
+    def remember(self, key: str, vector: bytes) -> None:
+        if len(vector) > self.max_bytes or key in self.vectors:
+            return
+        self.vectors[key] = vector
+        self.size += len(vector)
+        while self.size > self.max_bytes:
+            _, evicted = self.vectors.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self) -> EmbeddingCacheStats:
+        return EmbeddingCacheStats(
+            max_bytes=self.max_bytes,
+            bytes=self.size,
+            entries=len(self.vectors),
+            memory_hits=self.memory_hits,
+            store_hits=self.store_hits,
+            misses=self.misses,
+        )
+
+
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_MAX_BYTES)
@@ -1,14 +1,17 @@
 from fastapi import HTTPException
-from models.embedding_model import EmbeddingResponse, EmbeddingSample
+from models.embedding_model import (
+    EmbeddingResponse,
+    EmbeddingSample,
+    EMBEDDING_SIMILARITY_BLOCK_BYTES,
+    EMBEDDING_SIMILARITY_THRESHOLD,
+)
 from models.sample_model import SampleType, SamplesResponse, Sample
 from services.sample_service import SampleService
+from services.clip_service import ClipService
 import torch.nn.functional as F
 import torch
 from typing import Tuple, List
-import httpx
 import logging
-import json
-import os
 
 
 logger = logging.getLogger("uvicorn")
@@ -21,53 +24,54 @@ class EmbeddingService:
         type: SampleType,
     ) -> Tuple[list[list[float]], SamplesResponse]:
         """
-        Retrieve embeddings for the given sample text or image content
+        Retrieve embeddings for the given sample text or image content. The
+        embeddings stored in the samples are reused, and only the samples without
+        one are sent to the CLIP sidecar.
         """
 
         try:
-            data = await SampleService.get_samples(type)
-            text_content, image_content = [], []
-            if type == SampleType.TEXT:
-                clip_key = "textVectors"
-                text_content = [sample.metadata.content for sample in data.samples]
-            else:
-                clip_key = "imageVectors"
-                image_content = [sample.metadata.content for sample in data.samples]
-            url = f'{os.environ["CLIP_INFERENCE_API"]}/vectorize'
-            headers = {"accept": "application/json", "Content-Type": "application/json"}
-            content = json.dumps({"texts": text_content, "images": image_content})
-
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, content=content)
-                if response.status_code == 200:
-                    response_data = response.json()
-                    vectors = response_data.get(clip_key, [])
-                else:
-                    raise ValueError("Failed to get embeddings")
-
+            samples = await Sample.find(Sample.metadata.type == type).to_list(None)
+            vectors = await ClipService.embed_samples(type, samples)
+            # the samples whose image is missing from the image store are left out
+            samples = [s for s, v in zip(samples, vectors) if v is not None]
+            vectors = [vector for vector in vectors if vector is not None]
+            data = SamplesResponse(samples=samples)
         except Exception:
-            HTTPException(status_code=400, detail="Failed to get embeddings")
+            logger.error("Failed to get embeddings", exc_info=True)
+            raise HTTPException(status_code=400, detail="Failed to get embeddings")
 
         return vectors, data
 
     @staticmethod
     def compute_similarity(
-        vectors: list[list[float]], samples: list[Sample]
+        vectors: list[list[float]],
+        samples: list[Sample],
+        threshold: float = EMBEDDING_SIMILARITY_THRESHOLD,
+        block_bytes: int = EMBEDDING_SIMILARITY_BLOCK_BYTES,
     ) -> List[Tuple[Sample, Sample, list[float]]]:
         """
         Compute similarity between embeddings and return similar samples.
+
+        The pairs (i, j), i < j, of cosine similarity above `threshold` come in
+        the order of i then j. The similarity matrix is never built whole: each
+        block of rows is compared to the rows from its first one onwards, the
+        block holding `block_bytes` of similarities at most, and the pairs of the
+        upper triangle above the threshold are taken from it at once.
         """
 
         embeddings = torch.tensor(vectors, dtype=torch.float32)
         embeddings = F.normalize(embeddings)
-        similarity_matrix = torch.mm(embeddings, embeddings.T)
-        threshold = 0.95
+        count = embeddings.size(0)
+        block_rows = max(1, block_bytes // (4 * max(1, count)))
 
         similarity = []
-        for i in range(embeddings.size(0)):
-            for j in range(i + 1, embeddings.size(0)):
-                if similarity_matrix[i, j] > threshold:
-                    similarity.append((samples[i], samples[j], vectors[j]))
+        for start in range(0, count, block_rows):
+            block = torch.mm(
+                embeddings[start : start + block_rows], embeddings[start:].T
+            )
+            pairs = torch.triu(block > threshold, diagonal=1).nonzero() + start
+            for i, j in pairs.tolist():
+                similarity.append((samples[i], samples[j], vectors[j]))
 
         return similarity
 
@@ -0,0 +1,110 @@
+from fastapi import HTTPException
+from models.image_model import StoredImage
+from beanie.operators import In
+from pymongo.errors import DuplicateKeyError
+from PIL import Image
+from io import BytesIO
+from typing import Dict, List, Tuple
+import asyncio
+import base64
+import hashlib
+import logging
+
+logger = logging.getLogger("uvicorn")
+
+# Formats a thumbnail keeps (the others are served as PNG), and the modes they save
+THUMBNAIL_MODES = {
+    "JPEG": ("RGB", "L"),
+    "PNG": ("RGB", "RGBA", "L", "LA", "P"),
+    "WEBP": ("RGB", "RGBA"),
+}
+
+
+def image_info(data: bytes) -> Tuple[str, int, int]:
+    """Media type and size of the image, ValueError if it is not an image"""
+    try:
+        with Image.open(BytesIO(data)) as img:
+            return Image.MIME.get(img.format, "image/png"), img.width, img.height
+    except Exception as e:
+        raise ValueError(f"Not an image: {e}")
+
+
+def thumbnail(data: bytes, size: int) -> Tuple[bytes, str]:
+    """
+    The image scaled down to fit in `size` x `size` pixels (aspect ratio kept), and
+    its media type.
+    """
+    with Image.open(BytesIO(data)) as img:
+        image_format = img.format if img.format in THUMBNAIL_MODES else "PNG"
+        img.thumbnail((size, size))
+        if img.mode not in THUMBNAIL_MODES[image_format]:
+            img = img.convert("RGB" if image_format == "JPEG" else "RGBA")
+        output = BytesIO()
+        img.save(output, format=image_format)
+        return output.getvalue(), Image.MIME[image_format]
+
+
+class ImageStoreService:
+
+    @staticmethod
+    def key(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    async def exists(key: str) -> bool:
+        return await StoredImage.find(StoredImage.id == key).count() > 0
+
+    @staticmethod
+    async def put(data: bytes) -> str:
+        """
+        Stores the image unless it is already stored, and returns its key.
+        """
+        key = ImageStoreService.key(data)
+        if await ImageStoreService.exists(key):
+            return key
+        media_type, width, height = await asyncio.to_thread(image_info, data)
+        try:
+            await StoredImage(
+                id=key, data=data, media_type=media_type, width=width, height=height
+            ).insert()
+        except DuplicateKeyError:
+            pass  # stored meanwhile by another request
+        return key
+
+    @staticmethod
+    async def put_base64(content: str) -> str:
+        return await ImageStoreService.put(base64.b64decode(content, validate=True))
+
+    @staticmethod
+    async def get(key: str) -> StoredImage:
+        image = await StoredImage.get(key)
+        if image is None:
+            raise HTTPException(status_code=404, detail=f"Image '{key}' not found")
+        return image
+
+    @staticmethod
+    async def check(key: str) -> None:
+        """404 unless the image is stored, without reading it"""
+        if not await ImageStoreService.exists(key):
+            raise HTTPException(status_code=404, detail=f"Image '{key}' not found")
+
+    @staticmethod
+    async def get_base64(keys: List[str]) -> Dict[str, str]:
+        """
+        Base64 of the stored images, by key (the missing images are left out).
+        """
+        if not keys:
+            return {}
+        images = await StoredImage.find(In(StoredImage.id, list(set(keys)))).to_list()
+        return {image.id: base64.b64encode(image.data).decode() for image in images}
+
+    @staticmethod
+    async def get_thumbnail(key: str, size: int) -> Tuple[bytes, str]:
+        """
+        The stored image scaled down to fit in `size` x `size` pixels, or as is if
+        it already fits.
+        """
+        image = await ImageStoreService.get(key)
+        if image.width <= size and image.height <= size:
+            return image.data, image.media_type
+        return await asyncio.to_thread(thumbnail, image.data, size)
@@ -0,0 +1,219 @@
+from fastapi import HTTPException
+from beanie import PydanticObjectId
+from models.job_model import (
+    ScrapeJob,
+    ScrapeJobStatus,
+    SCRAPER_JOB_WORKERS,
+    SCRAPER_JOB_POLL_INTERVAL,
+    SCRAPER_JOB_TIMEOUT,
+    SCRAPER_JOB_MAX_WAIT,
+)
+from models.scraper_model import ScraperRequest
+from services.scraper_service import ScraperService
+from services.result_cache_service import ResultCacheService
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+
+
+logger = logging.getLogger("uvicorn")
+
+
+class ScrapeJobService:
+    """
+    Queue of scrape jobs stored in Mongo. Each uvicorn worker runs a pool of
+    `SCRAPER_JOB_WORKERS` tasks claiming the pending jobs atomically, so a job is
+    run once whichever worker received it, and any worker can answer a poll.
+    """
+
+    _workers: List[asyncio.Task] = []
+    _wakeup: Optional[asyncio.Event] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def start(cls) -> None:
+        loop = asyncio.get_running_loop()
+        if cls._loop is loop and cls._workers:
+            return
+        cls._loop = loop
+        cls._wakeup = asyncio.Event()
+        cls._workers = [
+            asyncio.create_task(cls.work()) for _ in range(SCRAPER_JOB_WORKERS)
+        ]
+
+    @classmethod
+    async def startup(cls) -> None:
+        cls.start()
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        for task in cls._workers:
+            task.cancel()
+        await asyncio.gather(*cls._workers, return_exceptions=True)
+        cls._workers, cls._wakeup, cls._loop = [], None, None
+
+    @classmethod
+    async def submit(cls, request: ScraperRequest) -> ScrapeJob:
+        """
+        Queues a scrape job, or returns the pending or running job of the same
+        normalized url, mode, language, parser and number of best nodes (the key
+        of the shared scrapes).
+        """
+
+        key = ScraperService.scrape_key(
+            request.url,
+            request.image_search,
+            request.language,
+            request.parser,
+            request.k,
+        )
+        while True:
+            job = ScrapeJob(request=request, key=key, active_key=key)
+            try:
+                await job.insert()
+                break
+            except DuplicateKeyError:
+                existing = await ScrapeJob.find_one(ScrapeJob.active_key == key)
+                if existing is not None:
+                    return existing
+                # the job finished in between, queue a new one
+        cls.start()
+        cls._wakeup.set()
+        return job
+
+    @classmethod
+    async def get(cls, id: PydanticObjectId, wait: float = 0) -> ScrapeJob:
+        """
+        Returns the job, once finished or after `wait` seconds (capped to
+        `SCRAPER_JOB_MAX_WAIT`) if it is still pending or running, with the images
+        of its result read back from the image store.
+        """
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(wait, SCRAPER_JOB_MAX_WAIT)
+        while True:
+            job = await ScrapeJob.get(id)
+            if job is None:
+                raise HTTPException(status_code=404, detail=f"Job '{id}' not found")
+            remaining = deadline - loop.time()
+            finished = job.status in (ScrapeJobStatus.DONE, ScrapeJobStatus.FAILED)
+            if finished or remaining <= 0:
+                return await cls.load_images(job)
+            await asyncio.sleep(min(SCRAPER_JOB_POLL_INTERVAL, remaining))
+
+    @staticmethod
+    async def claim() -> Optional[ScrapeJob]:
+        """
+        Marks the oldest pending job (or a job started more than
+        `SCRAPER_JOB_TIMEOUT` seconds ago, past the deadline of any request, whose
+        worker died) as running, and returns it.
+        """
+
+        now = datetime.now(timezone.utc)
+        document = await ScrapeJob.get_motor_collection().find_one_and_update(
+            {
+                "$or": [
+                    {"status": ScrapeJobStatus.PENDING.value},
+                    {
+                        "status": ScrapeJobStatus.RUNNING.value,
+                        "started_at": {
+                            "$lt": now - timedelta(seconds=SCRAPER_JOB_TIMEOUT)
+                        },
+                    },
+                ]
+            },
+            {"$set": {"status": ScrapeJobStatus.RUNNING.value, "started_at": now}},
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return ScrapeJob.model_validate(document) if document else None
+
+    @staticmethod
+    async def load_images(job: ScrapeJob) -> ScrapeJob:
+        """
+        The job with the base64 images of its result, stored apart in the image
+        store (the images missing from it are left empty).
+        """
+        result = job.result
+        if result is None or not job.request.image_search:
+            return job
+        try:
+            metadata, candidates = await ResultCacheService.load_images(
+                result.metadata, result.candidates
+            )
+        except KeyError:
+            logger.warning(f"Images of scrape job {job.id} left the image store")
+            return job
+        job.result = result.model_copy(
+            update={"metadata": metadata, "candidates": candidates}
+        )
+        return job
+
+    @staticmethod
+    async def run(job: ScrapeJob) -> None:
+        """
+        Runs the job and stores its result. The images of an image result are
+        moved to the image store like those of the result cache, so that the job
+        stays far below the 16MB limit of a Mongo document.
+        """
+        request = job.request
+        update = {"status": ScrapeJobStatus.DONE.value}
+        try:
+            result = await ScraperService.get_best_page_text(
+                request.url,
+                request.image_search,
+                request.language,
+                parser=request.parser,
+                max_age=request.max_age,
+                k=request.k,
+                timeout=request.timeout,
+            )
+            if request.image_search and result.status == "success":
+                metadata, candidates = await ResultCacheService.store_images(
+                    result.metadata, result.candidates
+                )
+                result = result.model_copy(
+                    update={"metadata": metadata, "candidates": candidates}
+                )
+            update["result"] = result.model_dump(mode="json")
+        except HTTPException as e:
+            update = {"status": ScrapeJobStatus.FAILED.value, "error": e.detail}
+        except Exception as e:
+            logger.error(f"Scrape job {job.id} failed", exc_info=True)
+            update = {"status": ScrapeJobStatus.FAILED.value, "error": f"{e}"}
+        update["finished_at"] = datetime.now(timezone.utc)
+        collection = ScrapeJob.get_motor_collection()
+        try:
+            await collection.update_one(
+                {"_id": job.id}, {"$set": update, "$unset": {"active_key": ""}}
+            )
+        except Exception:
+            # the job must not stay running: its key would hold the next submissions
+            logger.error(f"Failed to store scrape job {job.id}", exc_info=True)
+            update = {
+                "status": ScrapeJobStatus.FAILED.value,
+                "error": "Failed to store the result of the job",
+                "finished_at": update["finished_at"],
+            }
+            await collection.update_one(
+                {"_id": job.id}, {"$set": update, "$unset": {"active_key": ""}}
+            )
+
+    @classmethod
+    async def work(cls) -> None:
+        while True:
+            try:
+                job = await cls.claim()
+                if job is not None:
+                    await cls.run(job)
+                    continue
+            except Exception:
+                logger.error("Scrape job worker error", exc_info=True)
+            cls._wakeup.clear()
+            try:
+                await asyncio.wait_for(cls._wakeup.wait(), SCRAPER_JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,104 @@
+from models.stats_model import BatchSizeBucket, MicroBatcherStats
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+import asyncio
+import time
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesces the items submitted by concurrent callers into batches: a batch is
+    sent once `max_size` items wait, or `window` seconds after its first item,
+    by one call of `handler` with the items in order, and each caller gets the
+    result of its own item (or the error of the batch). Up to `max_in_flight`
+    batches are sent at the same time.
+
+    A longer window makes larger batches (throughput) at the cost of the wait of
+    the first items (latency).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[T]], Awaitable[List[R]]],
+        max_size: int,
+        window: float,
+        max_in_flight: int,
+    ):
+        self.handler = handler
+        self.max_size = max(1, max_size)
+        self.window = max(0.0, window)
+        self.max_in_flight = max(1, max_in_flight)
+        self.items: List[Tuple[T, asyncio.Future, float]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.tasks: Set[asyncio.Task] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # histogram of the batch sizes: sizes[i] counts the batches of more than
+        # 2**(i-1) and at most 2**i items
+        self.sizes = [0] * ((self.max_size - 1).bit_length() + 1)
+        self.items_sent = 0
+        self.full_batches = 0
+        self.failures = 0
+        self.wait = 0.0
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop, self.items, self.timer = loop, [], None
+            self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        future = loop.create_future()
+        self.items.append((item, future, time.monotonic()))
+        if len(self.items) >= self.max_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.items = self.items, []
+        if batch:
+            task = asyncio.create_task(self.send(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def send(self, batch: List[Tuple[T, asyncio.Future, float]]) -> None:
+        async with self.semaphore:
+            now = time.monotonic()
+            self.sizes[(len(batch) - 1).bit_length()] += 1
+            self.items_sent += len(batch)
+            self.full_batches += len(batch) >= self.max_size
+            self.wait += sum(now - submitted for _, _, submitted in batch)
+            try:
+                results = await self.handler([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError("Number of results and items do not match.")
+            except Exception as e:
+                self.failures += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self, name: str) -> MicroBatcherStats:
+        return MicroBatcherStats(
+            name=name,
+            max_size=self.max_size,
+            window=self.window,
+            batches=sum(self.sizes),
+            items=self.items_sent,
+            full_batches=self.full_batches,
+            failures=self.failures,
+            mean_wait=self.wait / self.items_sent if self.items_sent else 0.0,
+            sizes=[
+                BatchSizeBucket(le=2**i, count=count)
+                for i, count in enumerate(self.sizes)
+            ],
+        )
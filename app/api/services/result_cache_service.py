@@ -0,0 +1,180 @@
+from models.scraper_model import (
+    ScraperMetaData,
+    ScraperCandidate,
+    ScraperResult,
+    SCRAPER_RESULT_TTL,
+)
+from scraper_engine.language_supported import LanguageSupported
+from scraper_engine.html_parser import DEFAULT_HTML_PARSER, HtmlParser
+from scraper_engine.website import Website
+from scraper_engine import deadline
+from services.image_store_service import ImageStoreService
+from beanie.operators import Set
+from pydantic import HttpUrl
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
+import logging
+
+
+logger = logging.getLogger("uvicorn")
+
+
+class ResultCacheService:
+    """
+    Memoizes scrape results in Mongo, so that every worker can serve a recent result
+    for the same normalized url, mode, language and parser without fetching the
+    page (the parser backend can change the tree, hence the best node). The
+    images of an image result are kept in the image store, the cached result only
+    holds their `image_id`.
+    """
+
+    @staticmethod
+    def key(
+        url: HttpUrl,
+        image_search: bool,
+        language: LanguageSupported,
+        parser: Optional[HtmlParser] = None,
+    ) -> str:
+        mode = "image" if image_search else "text"
+        parser = parser or DEFAULT_HTML_PARSER
+        return (
+            f"{mode}:{language.value}:{parser.value}:{Website(url=url).normalized_url}"
+        )
+
+    @staticmethod
+    async def get(
+        url: HttpUrl,
+        image_search: bool,
+        language: LanguageSupported,
+        max_age: Optional[int] = None,
+        k: int = 1,
+        parser: Optional[HtmlParser] = None,
+    ) -> Optional[Tuple[ScraperMetaData, List[ScraperCandidate]]]:
+        """
+        Returns the cached result (best node and next `k - 1` best nodes) if it is
+        younger than `max_age` seconds (and than `SCRAPER_RESULT_TTL`) and was
+        scraped for at least `k` nodes, None otherwise. `max_age=0` always misses,
+        and so does an image result whose images left the image store.
+        """
+
+        max_age = SCRAPER_RESULT_TTL if max_age is None else max_age
+        max_age = min(max_age, SCRAPER_RESULT_TTL)
+        if max_age <= 0:
+            return None
+        try:
+            result = await deadline.wait_for(
+                ScraperResult.find_one(
+                    ScraperResult.key
+                    == ResultCacheService.key(url, image_search, language, parser)
+                )
+            )
+        except Exception:
+            logger.error("Failed to read the scrape result cache", exc_info=True)
+            return None
+        if result is None or result.k < k:
+            return None
+        created_at = result.created_at
+        if created_at.tzinfo is None:  # Mongo returns naive UTC datetimes
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        age = (datetime.now(timezone.utc) - created_at).total_seconds()
+        if age >= max_age:
+            return None
+        metadata, candidates = result.metadata, result.candidates[: k - 1]
+        if image_search:
+            try:
+                return await deadline.wait_for(
+                    ResultCacheService.load_images(metadata, candidates)
+                )
+            except KeyError:
+                return None  # removed from the image store
+            except Exception:
+                logger.error("Failed to read the cached images", exc_info=True)
+                return None
+        return metadata, candidates
+
+    @staticmethod
+    async def put(
+        url: HttpUrl,
+        image_search: bool,
+        language: LanguageSupported,
+        metadata: ScraperMetaData,
+        candidates: List[ScraperCandidate] = [],
+        k: int = 1,
+        parser: Optional[HtmlParser] = None,
+    ) -> None:
+        key = ResultCacheService.key(url, image_search, language, parser)
+        try:
+            if image_search:
+                metadata, candidates = await deadline.wait_for(
+                    ResultCacheService.store_images(metadata, candidates)
+                )
+            await deadline.wait_for(
+                ScraperResult.find_one(ScraperResult.key == key).upsert(
+                    Set(
+                        {
+                            ScraperResult.metadata: metadata.model_dump(mode="json"),
+                            ScraperResult.candidates: [
+                                candidate.model_dump() for candidate in candidates
+                            ],
+                            ScraperResult.k: k,
+                            ScraperResult.created_at: datetime.now(timezone.utc),
+                        }
+                    ),
+                    on_insert=ScraperResult(
+                        key=key, metadata=metadata, candidates=candidates, k=k
+                    ),
+                )
+            )
+        except Exception:
+            logger.error("Failed to write the scrape result cache", exc_info=True)
+
+    @staticmethod
+    async def store_images(
+        metadata: ScraperMetaData, candidates: List[ScraperCandidate]
+    ) -> Tuple[ScraperMetaData, List[ScraperCandidate]]:
+        """
+        Copies of an image result whose images are moved to the image store: each
+        base64 content is replaced by the `image_id` of its image, so that a result
+        with `k` images stays far below the 16MB limit of a Mongo document.
+        """
+        results = [metadata, *candidates]
+        image_ids = await asyncio.gather(
+            *(
+                ImageStoreService.put_base64(result.content)
+                for result in results
+                if result.content
+            )
+        )
+        stored = iter(image_ids)
+        metadata, *candidates = [
+            (
+                result.model_copy(update={"image_id": next(stored), "content": ""})
+                if result.content
+                else result
+            )
+            for result in results
+        ]
+        return metadata, candidates
+
+    @staticmethod
+    async def load_images(
+        metadata: ScraperMetaData, candidates: List[ScraperCandidate]
+    ) -> Tuple[ScraperMetaData, List[ScraperCandidate]]:
+        """
+        Copies of a cached image result with the base64 of their images read back
+        from the image store, KeyError if one of them is missing.
+        """
+        results = [metadata, *candidates]
+        images = await ImageStoreService.get_base64(
+            [result.image_id for result in results if result.image_id]
+        )
+        metadata, *candidates = [
+            (
+                result.model_copy(update={"content": images[result.image_id]})
+                if result.image_id
+                else result
+            )
+            for result in results
+        ]
+        return metadata, candidates
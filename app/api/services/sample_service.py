@@ -1,6 +1,7 @@
 from fastapi import HTTPException
 from models.sample_model import (
     Sample,
+    SampleType,
     SampleResponse,
     SamplesResponse,
     DeleteSamplesResponse,
@@ -8,6 +9,9 @@ from models.sample_model import (
     GroupSampleType,
     DeleteUniqueSampleResponse,
 )
+from services.image_store_service import ImageStoreService
+from services.clip_service import ClipService
+from scraper_engine import deadline
 import logging
 from beanie import PydanticObjectId
 
@@ -18,9 +22,18 @@ class SampleService:
 
     @staticmethod
     async def add_sample(sample: Sample) -> SampleResponse:
+        """
+        Stores the sample unless one of the same url exists, within the deadline of
+        the request if there is one (`DeadlineExceeded` once it expires). The bytes
+        of an image sample go to the image store, and the sample keeps their key in
+        `image_id` instead of the base64 content. The embedding of a new sample is
+        computed in the background.
+        """
         try:
-            existing_sample = await Sample.find_one(
-                Sample.metadata.url == sample.metadata.url,
+            existing_sample = await deadline.wait_for(
+                Sample.find_one(
+                    Sample.metadata.url == sample.metadata.url,
+                )
             )
             if existing_sample:
                 return SampleResponse(
@@ -29,8 +42,18 @@ class SampleService:
                     message="Sample already exists and was not added.",
                 )
 
-            await sample.insert()
+            if sample.metadata.type == SampleType.IMAGE and sample.metadata.content:
+                image_id = await deadline.wait_for(
+                    ImageStoreService.put_base64(sample.metadata.content)
+                )
+                sample.metadata = sample.metadata.model_copy(
+                    update={"image_id": image_id, "content": ""}
+                )
+            await deadline.wait_for(sample.insert())
+            ClipService.embed_later(sample)
             return SampleResponse(id=str(sample.id), metadata=sample.metadata)
+        except deadline.DeadlineExceeded:
+            raise
         except Exception:
             logger.error("Failed to add sample", exc_info=True)
             raise HTTPException(
@@ -1,16 +1,53 @@
 from fastapi import HTTPException
-from models.scraper_model import ScraperResponse, ScraperMetaData, ScraperType
+from models.scraper_model import (
+    ScraperResponse,
+    ScraperMetaData,
+    ScraperCandidate,
+    ScraperType,
+    ScraperBatchRequest,
+    ScraperBatchResponse,
+    ScraperCrawlRequest,
+    ScraperCrawlResponse,
+    SCRAPER_CRAWL_SLOW_SECONDS,
+)
 from models.sample_model import Sample
+from models.stats_model import HttpClientName
+from data.http_client import HTTP_CLIENT_SETTINGS
 from scraper_engine.scraper_graph import ScraperGraph
 from scraper_engine.language_supported import LanguageSupported
+from scraper_engine.html_parser import HtmlParser
+from scraper_engine.website import Website
+from scraper_engine import deadline
+from scraper_engine.deadline import SCRAPER_REQUEST_TIMEOUT
+from scraper_engine.page_fetcher import PageRejected
 from services.sample_service import SampleService
+from services.result_cache_service import ResultCacheService
+from services.image_store_service import ImageStoreService
+from services.singleflight import SingleFlight
+from services.adaptive_limiter import AdaptiveLimiter
 from pydantic import HttpUrl
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import asyncio
+import heapq
 import traceback
 import logging
 
 
 logger = logging.getLogger("uvicorn")
 
+# File extensions of the links not followed by the crawler (not html pages)
+CRAWL_SKIPPED_EXTENSIONS = tuple(
+    (
+        ".7z .avi .css .csv .doc .docx .gif .gz .ico .jpeg .jpg .js .json .mov .mp3 "
+        ".mp4 .pdf .png .ppt .pptx .rar .svg .tar .txt .wav .webm .webp .xls .xlsx "
+        ".xml .zip"
+    ).split()
+)
+
+# Scrapes in flight in this worker, shared by the identical concurrent requests
+scrapes_in_flight = SingleFlight()
+
 
 class ScraperService:
 
@@ -19,65 +56,411 @@ class ScraperService:
         url: HttpUrl,
         image_search: bool,
         language: LanguageSupported = LanguageSupported.EN,
-    ) -> ScraperMetaData:
+        parser: Optional[HtmlParser] = None,
+        k: int = 1,
+    ) -> Tuple[ScraperMetaData, List[ScraperCandidate]]:
         """
-        Builds a scraper graph and returns the best node from the graph.
+        Builds a scraper graph and returns the best node from the graph, with the
+        next `k - 1` best nodes not overlapping it or each other.
         """
 
         tree = await ScraperGraph.create(
-            url, image_search=image_search, language=language
-        )
-        best_node = tree.get_best_node()
-        content = (
-            best_node.img_metadata.img_base64
-            if best_node.img_metadata
-            else best_node.data.get_text(" ").strip()
+            url, image_search=image_search, language=language, parser=parser, k=k
         )
-        return ScraperMetaData(
+        return ScraperService.tree_results(tree, url, image_search, language)
+
+    @staticmethod
+    def tree_results(
+        tree: ScraperGraph,
+        url: HttpUrl,
+        image_search: bool,
+        language: LanguageSupported,
+    ) -> Tuple[ScraperMetaData, List[ScraperCandidate]]:
+        candidates = [
+            ScraperCandidate(
+                tag=node.name,
+                score=node.score,
+                image_url=node.img_metadata.url if node.img_metadata else None,
+                content=(
+                    node.img_metadata.img_base64
+                    if node.img_metadata
+                    else tree.node_text(node)
+                ),
+            )
+            for node in tree.get_best_nodes()
+        ]
+        best = candidates.pop(0)
+        metadata = ScraperMetaData(
             url=url,
-            content=content,
-            image_url=(best_node.img_metadata.url if best_node.img_metadata else None),
-            tag=best_node.name,
+            content=best.content,
+            image_url=best.image_url,
+            tag=best.tag,
             language=language,
             type=ScraperType.IMAGE if image_search else ScraperType.TEXT,
+            truncated=tree.truncated,
         )
+        return metadata, candidates
+
+    @staticmethod
+    async def scrape_and_cache(
+        url: HttpUrl,
+        image_search: bool,
+        language: LanguageSupported,
+        parser: Optional[HtmlParser] = None,
+        k: int = 1,
+    ) -> Tuple[ScraperMetaData, List[ScraperCandidate]]:
+        """
+        Scrapes the page and caches the result. The scrape keeps a short reserve
+        of the time left before the deadline (a tenth, one second at most), to
+        store and answer a partial result cut short by the deadline.
+        """
+        left = deadline.remaining()
+        with deadline.deadline(None if left is None else left - min(left / 10, 1)):
+            metadata, candidates = await ScraperService.scraper_search(
+                url=url,
+                image_search=image_search,
+                language=language,
+                parser=parser,
+                k=k,
+            )
+        await ResultCacheService.put(
+            url, image_search, language, metadata, candidates, k=k, parser=parser
+        )
+        return metadata, candidates
 
     @staticmethod
     async def get_best_page_text(
         url: HttpUrl,
         image_search: bool,
         language: LanguageSupported = LanguageSupported.EN,
+        parser: Optional[HtmlParser] = None,
+        max_age: Optional[int] = None,
+        k: int = 1,
+        timeout: Optional[float] = None,
     ) -> ScraperResponse:
         """
-        Get the best text content from the page.
+        Get the best text content from the page (and the next `k - 1` best nodes as
+        candidates), or the cached result of a scrape of the same page, mode and
+        language younger than `max_age` seconds. Identical requests arriving while
+        the page is scraped wait for the same scrape.
+
+        Everything the request waits for (page fetch, image downloads, database
+        calls) is bounded by a deadline `timeout` seconds from now (by default
+        `SCRAPER_REQUEST_TIMEOUT`), and cancelled once it expires: the request then
+        fails with a 504, unless an image search already loaded some images.
         """
 
         try:
-            metadata = await ScraperService.scraper_search(
-                url=url, image_search=image_search, language=language
-            )
-            sample = await SampleService.add_sample(Sample(metadata=metadata))
-            return ScraperResponse(
-                metadata=metadata,
-                status="success",
-                message=f"{'Image' if image_search else 'Text'} content was successfully extracted from the page.",
-                database_log=sample.message,
-            )
+            with deadline.deadline(timeout or SCRAPER_REQUEST_TIMEOUT):
+                result = await ResultCacheService.get(
+                    url, image_search, language, max_age=max_age, k=k, parser=parser
+                )
+                cached = result is not None
+                if not cached:
+                    result = await ScraperService.shared_scrape(
+                        url, image_search, language, parser, k
+                    )
+                metadata, candidates = result
+                return await ScraperService.success_response(
+                    metadata, candidates, image_search, cached=cached
+                )
 
         except ScraperGraph.NoFound as e:
-            return ScraperResponse(
-                metadata=ScraperMetaData(
-                    url=url,
-                    content="None",
-                    tag="None",
-                    language=language,
-                    type=ScraperType.IMAGE if image_search else ScraperType.TEXT,
-                ),
-                status="failed",
-                message=f"{e}",
-                database_log="",
+            return ScraperService.failed_response(url, image_search, language, f"{e}")
+
+        except deadline.DeadlineExceeded:
+            logger.warning(f"Deadline exceeded scraping the webpage: {url}")
+            raise HTTPException(
+                status_code=504, detail="The deadline of the request expired"
             )
 
+        except HTTPException:
+            raise
+
         except Exception:
             logger.error(traceback.format_exc())
             raise HTTPException(status_code=500, detail="Failed to scrape the webpage")
+
+    @staticmethod
+    def scrape_key(
+        url: HttpUrl,
+        image_search: bool,
+        language: LanguageSupported,
+        parser: Optional[HtmlParser] = None,
+        k: int = 1,
+    ) -> str:
+        """
+        Key of the identical scrapes, sharing their result: the key of the result
+        cache (normalized url, mode, language and parser) and the number of nodes.
+        """
+        return f"{ResultCacheService.key(url, image_search, language, parser)}:{k}"
+
+    @staticmethod
+    async def shared_scrape(
+        url: HttpUrl,
+        image_search: bool,
+        language: LanguageSupported,
+        parser: Optional[HtmlParser] = None,
+        k: int = 1,
+    ) -> Tuple[ScraperMetaData, List[ScraperCandidate]]:
+        """
+        Waits, until the deadline of the request, for the scrape of the page shared
+        by the identical requests (started by the first of them). The scrape runs
+        until the deadline of the request that started it: if it expires before the
+        deadline of this request, this request scrapes the page again.
+        """
+        key = ScraperService.scrape_key(url, image_search, language, parser, k)
+        while True:
+            started = False
+
+            def scrape():
+                nonlocal started
+                started = True
+                return ScraperService.scrape_and_cache(
+                    url, image_search, language, parser, k
+                )
+
+            try:
+                return await deadline.wait_for(scrapes_in_flight.do(key, scrape))
+            except deadline.DeadlineExceeded:
+                if started or deadline.expired():
+                    raise
+                logger.info(f"Shared scrape timed out, scraping again: {url}")
+
+    @staticmethod
+    async def success_response(
+        metadata: ScraperMetaData,
+        candidates: List[ScraperCandidate],
+        image_search: bool,
+        cached: bool = False,
+    ) -> ScraperResponse:
+        """
+        Stores the best node as a sample and reports the success. The response of
+        an image search holds the base64 image and its `image_id` in the image
+        store.
+        """
+        sample = Sample(metadata=metadata)
+        response = await SampleService.add_sample(sample)
+        if image_search and metadata.image_id is None and metadata.content:
+            image_id = sample.metadata.image_id or await deadline.wait_for(
+                ImageStoreService.put_base64(metadata.content)
+            )
+            metadata = metadata.model_copy(update={"image_id": image_id})
+        return ScraperResponse(
+            metadata=metadata,
+            status="success",
+            message=f"{'Image' if image_search else 'Text'} content was successfully extracted from the page.",
+            database_log=response.message,
+            cached=cached,
+            candidates=candidates,
+        )
+
+    @staticmethod
+    def failed_response(
+        url: HttpUrl,
+        image_search: bool,
+        language: LanguageSupported,
+        message: str,
+    ) -> ScraperResponse:
+        return ScraperResponse(
+            metadata=ScraperMetaData(
+                url=url,
+                content="None",
+                tag="None",
+                language=language,
+                type=ScraperType.IMAGE if image_search else ScraperType.TEXT,
+            ),
+            status="failed",
+            message=message,
+            database_log="",
+        )
+
+    @staticmethod
+    async def get_best_pages_text(
+        request: ScraperBatchRequest,
+    ) -> AsyncIterator[ScraperBatchResponse]:
+        """
+        Scrapes the pages of the batch with `request.concurrency` workers (the shared
+        scraper client also bounds the requests per host) and yields each response
+        as soon as it is ready, in completion order. Failures are yielded as failed
+        responses instead of interrupting the batch.
+        """
+
+        queue: asyncio.Queue = asyncio.Queue()
+        items = iter(enumerate(request.items))
+
+        async def worker():
+            for index, item in items:
+                try:
+                    response = await ScraperService.get_best_page_text(
+                        item.url,
+                        item.image_search,
+                        item.language,
+                        parser=item.parser,
+                        max_age=item.max_age,
+                        k=item.k,
+                        timeout=item.timeout,
+                    )
+                except HTTPException as e:
+                    response = ScraperService.failed_response(
+                        item.url, item.image_search, item.language, e.detail
+                    )
+                except Exception:
+                    # a worker must not die: the batch waits for a line per item
+                    logger.error(traceback.format_exc())
+                    response = ScraperService.failed_response(
+                        item.url,
+                        item.image_search,
+                        item.language,
+                        "Failed to scrape the webpage",
+                    )
+                await queue.put(
+                    ScraperBatchResponse(index=index, **response.model_dump())
+                )
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(request.concurrency, len(request.items)))
+        ]
+        try:
+            for _ in request.items:
+                yield await queue.get()
+        finally:
+            for task in workers:
+                task.cancel()
+
+    @staticmethod
+    async def crawl_page(
+        url: HttpUrl,
+        request: ScraperCrawlRequest,
+        limiter: AdaptiveLimiter,
+    ) -> Tuple[ScraperResponse, List[str]]:
+        """
+        Scrapes a page of a crawl, stores its best node as a sample (and as the
+        cached result of the page), and returns the response with the page links.
+        """
+        links: List[str] = []
+        try:
+            async with limiter.acquire():
+                with deadline.deadline(SCRAPER_REQUEST_TIMEOUT):
+                    tree = await ScraperGraph.create(
+                        url,
+                        image_search=request.image_search,
+                        language=request.language,
+                        parser=request.parser,
+                        follow_links=True,
+                    )
+            links = tree.links
+            metadata, candidates = ScraperService.tree_results(
+                tree, url, request.image_search, request.language
+            )
+            await ResultCacheService.put(
+                url,
+                request.image_search,
+                request.language,
+                metadata,
+                candidates,
+                parser=request.parser,
+            )
+            response = await ScraperService.success_response(
+                metadata, candidates, request.image_search
+            )
+        except ScraperGraph.NoFound as e:
+            response = ScraperService.failed_response(
+                url, request.image_search, request.language, f"{e}"
+            )
+        except Exception:
+            logger.error(traceback.format_exc())
+            response = ScraperService.failed_response(
+                url,
+                request.image_search,
+                request.language,
+                "Failed to scrape the webpage",
+            )
+        return response, links
+
+    @staticmethod
+    async def crawl_pages(
+        request: ScraperCrawlRequest,
+    ) -> AsyncIterator[ScraperCrawlResponse]:
+        """
+        Crawls the site from the seed url, following the links of the scraped pages
+        up to `request.max_depth` links away, until `request.max_pages` pages were
+        scraped. Each response is yielded as soon as its page is scraped.
+
+        The links are normalized and deduplicated, then scraped from a priority
+        frontier: the shallowest pages first, and at the same depth the pages below
+        the directory of the seed url first. At most `request.concurrency` pages are
+        scraped at the same time, and the pages of each host are bounded by an
+        adaptive limiter, backing off when the host is slow or failing.
+        """
+
+        seed = Website(url=request.url)
+        seed_host = urlparse(seed.normalized_url).hostname
+        seed_directory = urlparse(seed.normalized_url).path.rsplit("/", 1)[0] + "/"
+        maximum = (
+            HTTP_CLIENT_SETTINGS[HttpClientName.SCRAPER].max_connections_per_host
+            or request.concurrency
+        )
+        limiters: Dict[str, AdaptiveLimiter] = {}
+        # (depth, outside of the seed directory, discovery order, url)
+        frontier: List[Tuple[int, bool, int, HttpUrl]] = [(0, False, 0, seed.url)]
+        seen = {seed.normalized_url}
+        tasks: Dict[asyncio.Task, int] = {}
+        scheduled = 0
+
+        def add_links(links: List[str], depth: int) -> int:
+            added = 0
+            for link in links:
+                try:
+                    website = Website(url=link)
+                    normalized = urlparse(website.normalized_url)
+                except ValueError:
+                    continue
+                path = normalized.path.lower()
+                if (
+                    website.normalized_url in seen
+                    or (request.same_host and normalized.hostname != seed_host)
+                    or path.endswith(CRAWL_SKIPPED_EXTENSIONS)
+                ):
+                    continue
+                seen.add(website.normalized_url)
+                outside = not normalized.path.startswith(seed_directory)
+                heapq.heappush(frontier, (depth, outside, len(seen), website.url))
+                added += 1
+            return added
+
+        try:
+            while tasks or (frontier and scheduled < request.max_pages):
+                while (
+                    frontier
+                    and scheduled < request.max_pages
+                    and len(tasks) < request.concurrency
+                ):
+                    depth, _, _, url = heapq.heappop(frontier)
+                    host = (urlparse(str(url)).hostname or "").lower()
+                    if host not in limiters:
+                        limiters[host] = AdaptiveLimiter(
+                            2,
+                            maximum,
+                            SCRAPER_CRAWL_SLOW_SECONDS,
+                            answered=(PageRejected,),
+                        )
+                    task = asyncio.create_task(
+                        ScraperService.crawl_page(url, request, limiters[host])
+                    )
+                    tasks[task] = depth
+                    scheduled += 1
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    depth = tasks.pop(task)
+                    response, links = task.result()
+                    added = (
+                        add_links(links, depth + 1) if depth < request.max_depth else 0
+                    )
+                    yield ScraperCrawlResponse(
+                        depth=depth, links=added, **response.model_dump()
+                    )
+        finally:
+            for task in tasks:
+                task.cancel()
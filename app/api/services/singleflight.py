@@ -0,0 +1,24 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+class SingleFlight:
+    """
+    Shares one execution between the concurrent calls made with the same key: the
+    first call starts the work, the others wait for its result. The work runs in
+    its own task, so a caller giving up does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        return await asyncio.shield(task)
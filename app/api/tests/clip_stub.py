@@ -0,0 +1,111 @@
+"""
+Stub of the CLIP inference sidecar, answering POST /vectorize like the
+multi2vec-clip container, to run the embedding code offline:
+
+    uvicorn tests.clip_stub:app --port 8080
+    CLIP_INFERENCE_API=http://localhost:8080
+
+A text is embedded as a normalized bag of hashed words (texts sharing words are
+similar), an image as a hash of its base64. The stub counts the requests, and can
+delay them or fail the next ones with a 503 to exercise the client.
+"""
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
+import hashlib
+import math
+import socket
+import threading
+import uvicorn
+
+
+DIMENSIONS = 64
+
+
+class VectorizeRequest(BaseModel):
+    texts: List[str] = []
+    images: List[str] = []
+
+
+class StubState:
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batch_sizes: List[int] = []
+        self.failures = 0  # next requests answered with a 503
+        self.delay = 0.0
+
+
+state = StubState()
+app = FastAPI()
+
+
+def stub_vector(words: List[str]) -> List[float]:
+    vector = [0.0] * DIMENSIONS
+    for word in words:
+        vector[int(hashlib.sha256(word.encode()).hexdigest(), 16) % DIMENSIONS] += 1
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def text_vector(text: str) -> List[float]:
+    return stub_vector(text.lower().split())
+
+
+def image_vector(image: str) -> List[float]:
+    return stub_vector([image])
+
+
+@app.post("/vectorize")
+async def vectorize(request: VectorizeRequest):
+    state.requests += 1
+    if state.failures:
+        state.failures -= 1
+        return JSONResponse(status_code=503, content={"error": "stub failure"})
+    state.in_flight += 1
+    state.max_in_flight = max(state.max_in_flight, state.in_flight)
+    state.batch_sizes.append(len(request.texts) + len(request.images))
+    try:
+        await asyncio.sleep(state.delay)
+        return {
+            "textVectors": [text_vector(text) for text in request.texts],
+            "imageVectors": [image_vector(image) for image in request.images],
+        }
+    finally:
+        state.in_flight -= 1
+
+
+class ClipStubServer:
+    """
+    Runs the stub in a thread, on a free local port, for the time of a `with`.
+    """
+
+    def __init__(self):
+        self.server: Optional[uvicorn.Server] = None
+        self.thread: Optional[threading.Thread] = None
+        self.url = ""
+
+    def __enter__(self) -> "ClipStubServer":
+        state.__init__()
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("The CLIP stub server did not start")
+            threading.Event().wait(0.01)
+        self.url = f"http://127.0.0.1:{port}"
+        self.state = state
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
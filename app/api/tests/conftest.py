@@ -1,3 +1,4 @@
+import pytest
 import pytest_asyncio
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -6,7 +7,12 @@ from httpx import AsyncClient
 from app import app  # type: ignore
 import asyncio
 from models.sample_model import Sample
+from models.scraper_model import ScraperResult
+from models.job_model import ScrapeJob
+from models.image_model import StoredImage
+from models.embedding_model import CachedEmbedding
 from httpx._transports.asgi import ASGITransport
+from tests.clip_stub import ClipStubServer
 
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
@@ -14,7 +20,16 @@ async def async_client():
     client = AsyncIOMotorClient(os.environ.get("MONGO_URL"))
     client.get_io_loop = asyncio.get_running_loop
     await client.admin.command("ping")
-    await init_beanie(database=client["test_db"], document_models=[Sample])
+    await init_beanie(
+        database=client["test_db"],
+        document_models=[
+            Sample,
+            ScraperResult,
+            ScrapeJob,
+            StoredImage,
+            CachedEmbedding,
+        ],
+    )
 
     async with AsyncClient(
         transport=ASGITransport(app=app), base_url="http://test/api"
@@ -24,3 +39,10 @@ async def async_client():
         finally:
             await client.drop_database("test_db")
             client.close()
+
+
+@pytest.fixture
+def clip_stub(monkeypatch):
+    with ClipStubServer() as stub:
+        monkeypatch.setenv("CLIP_INFERENCE_API", stub.url)
+        yield stub
@@ -0,0 +1,24 @@
+import pytest
+from services.adaptive_limiter import AdaptiveLimiter
+
+
+class Answered(ValueError):
+    pass
+
+
+async def run(limiter: AdaptiveLimiter, error: Exception) -> None:
+    with pytest.raises(type(error)):
+        async with limiter.acquire():
+            raise error
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_answered_errors():
+    limiter = AdaptiveLimiter(4, 8, slow=5, answered=(Answered,))
+
+    await run(limiter, Answered("page not found"))
+    assert limiter.limit == 4.25  # a response: additive increase
+
+    await run(limiter, ValueError("host failing"))
+    assert limiter.limit == 2.125  # a failure: the limit is halved
+    assert limiter.in_flight == 0
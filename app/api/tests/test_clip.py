@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from models.sample_model import Sample, SampleType
+from models.scraper_model import ScraperMetaData
+from services import clip_service
+from services.clip_service import ClipService
+from services.embedding_cache import embedding_cache
+from tests.clip_stub import text_vector
+
+
+async def vectorize(contents, **kwargs):
+    vectors = []
+    async for batch in ClipService.vectorize(SampleType.TEXT, contents, **kwargs):
+        vectors.extend(batch)
+    return vectors
+
+
+@pytest.mark.asyncio
+async def test_vectorize_batches(clip_stub):
+    contents = [f"text number {i}" for i in range(10)]
+    clip_stub.state.delay = 0.05
+
+    vectors = await vectorize(contents, batch_size=3, concurrency=2)
+
+    assert vectors == [text_vector(text) for text in contents]
+    assert clip_stub.state.batch_sizes == [3, 3, 3, 1]
+    assert clip_stub.state.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_vectorize_retries(clip_stub, monkeypatch):
+    monkeypatch.setattr(clip_service, "CLIP_MAX_RETRIES", 2)
+    monkeypatch.setattr(clip_service, "CLIP_RETRY_BACKOFF", 0.01)
+    clip_stub.state.failures = 2
+
+    vectors = await vectorize(["a retried text"])
+
+    assert vectors == [text_vector("a retried text")]
+    assert clip_stub.state.requests == 3
+
+    clip_stub.state.failures = 3
+    with pytest.raises(ValueError, match="after 3 tries"):
+        await vectorize(["a failing text"])
+
+
+@pytest.mark.asyncio
+async def test_embed_micro_batches(clip_stub):
+    texts = [f"new sample {i}" for i in range(5)]
+
+    vectors = await asyncio.gather(
+        *[ClipService.embed(SampleType.TEXT, text) for text in texts]
+    )
+
+    assert vectors == [text_vector(text) for text in texts]
+    assert clip_stub.state.batch_sizes == [5]
+
+
+def close(vectors, expected):
+    """Equal up to the float32 precision of the stored embeddings"""
+    return len(vectors) == len(expected) and all(
+        vector == pytest.approx(other, abs=1e-6)
+        for vector, other in zip(vectors, expected)
+    )
+
+
+def text_sample(url, text):
+    return Sample(
+        metadata=ScraperMetaData(
+            url=url, tag="p", language="en", type=SampleType.TEXT, content=text
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_embed_samples_cache(clip_stub):
+    texts = ["a boilerplate paragraph", "a boilerplate paragraph", "an article"]
+    samples = [text_sample(f"https://cache.test/{i}", t) for i, t in enumerate(texts)]
+
+    vectors = await ClipService.embed_samples(SampleType.TEXT, samples)
+
+    assert close(vectors, [text_vector(text) for text in texts])
+    assert clip_stub.state.batch_sizes == [2]
+
+    for clear_memory in (False, True):
+        if clear_memory:
+            embedding_cache.vectors.clear()
+            embedding_cache.size = 0
+        samples = [text_sample("https://cache.test/other", texts[0])]
+        vectors = await ClipService.embed_samples(SampleType.TEXT, samples)
+        assert close(vectors, [text_vector(texts[0])])
+        assert clip_stub.state.requests == 1
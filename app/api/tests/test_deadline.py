@@ -0,0 +1,21 @@
+import asyncio
+import pytest
+from scraper_engine import deadline
+
+
+@pytest.mark.asyncio
+async def test_deadline():
+    assert deadline.remaining() is None
+    assert await deadline.wait_for(asyncio.sleep(0, "done")) == "done"
+
+    with deadline.deadline(0.05):
+        with deadline.deadline(10):  # the sooner deadline wins
+            assert deadline.remaining() <= 0.05
+        with pytest.raises(asyncio.TimeoutError) as error:
+            await deadline.wait_for(asyncio.sleep(1), timeout=0.01)
+        assert not isinstance(error.value, deadline.DeadlineExceeded)
+        with pytest.raises(deadline.DeadlineExceeded):
+            await deadline.wait_for(asyncio.sleep(1), timeout=1)
+        assert deadline.expired()
+
+    assert deadline.remaining() is None
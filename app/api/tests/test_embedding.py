@@ -1,17 +1,22 @@
 import pytest
+import torch
+import torch.nn.functional as F
 from httpx import AsyncClient
 from fastapi import status
+from services.embedding_service import EmbeddingService
+from services.clip_service import CLIP_MODEL
+from models.sample_model import Sample, SampleEmbedding, SampleType
 
 
 @pytest.mark.asyncio
-async def test_get_embeddings(async_client: AsyncClient):
+async def test_get_embeddings(async_client: AsyncClient, clip_stub):
     sample_data1 = {
         "metadata": {
             "url": "https://example1.com",
             "tag": "<p>",
             "language": "en",
             "type": "text",
-            "content": "Example text content",
+            "content": "Example text content about the scraper, used to check the near duplicates.",
         }
     }
     sample_data2 = {
@@ -20,7 +25,7 @@ async def test_get_embeddings(async_client: AsyncClient):
             "tag": "<p>",
             "language": "en",
             "type": "text",
-            "content": "Example text description",
+            "content": "Example text content about the scraper, used to check the near duplicates again.",
         }
     }
     sample_data3 = {
@@ -48,3 +53,41 @@ async def test_get_embeddings(async_client: AsyncClient):
     for sample in response_data["samples_deleted"]:
         assert "vectors" in sample
         assert "sample" in sample
+        assert "embedding" not in sample["sample"]
+
+    samples = await Sample.find(Sample.metadata.type == SampleType.TEXT).to_list()
+    assert samples
+    for sample in samples:
+        assert sample.embedding.model == CLIP_MODEL
+        assert len(sample.embedding.vector) == 4 * len(sample.embedding.to_vector())
+
+
+def test_compute_similarity_blocks():
+    generator = torch.Generator().manual_seed(0)
+    base = torch.randn(20, 8, generator=generator)
+    vectors = torch.cat([base, base[:10] + 0.01 * torch.randn(10, 8)]).tolist()
+    samples = [f"sample-{i}" for i in range(len(vectors))]
+
+    embeddings = F.normalize(torch.tensor(vectors))
+    matrix = torch.mm(embeddings, embeddings.T)
+    expected = [
+        (samples[i], samples[j], vectors[j])
+        for i in range(len(vectors))
+        for j in range(i + 1, len(vectors))
+        if matrix[i, j] > 0.95
+    ]
+
+    assert len(expected) >= 10
+    for block_bytes in (1, 4 * 30 * 7, 2**20):
+        pairs = EmbeddingService.compute_similarity(
+            vectors, samples, threshold=0.95, block_bytes=block_bytes
+        )
+        assert pairs == expected
+
+
+def test_sample_embedding():
+    vector = [0.5, -1.25, 3.0]
+    embedding = SampleEmbedding.from_vector("clip", vector)
+
+    assert len(embedding.vector) == 12
+    assert embedding.to_vector() == vector
@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import pytest
+from httpx import AsyncClient
+from io import BytesIO
+from PIL import Image
+
+
+def png_image(width: int, height: int) -> bytes:
+    output = BytesIO()
+    Image.new("RGBA", (width, height), (255, 0, 0, 128)).save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_image_sample(async_client: AsyncClient):
+    data = png_image(64, 32)
+    image_id = hashlib.sha256(data).hexdigest()
+    for url in ("https://www.exampleimage.com/a", "https://www.exampleimage.com/b"):
+        response = await async_client.post(
+            "/sample",
+            json={
+                "metadata": {
+                    "url": url,
+                    "tag": "<img>",
+                    "language": "en",
+                    "type": "image",
+                    "content": base64.b64encode(data).decode(),
+                }
+            },
+        )
+        assert response.status_code == 201
+        assert response.json()["metadata"]["image_id"] == image_id
+        assert response.json()["metadata"]["content"] == ""
+
+    response = await async_client.get("sample?type=image")
+    samples = [
+        sample
+        for sample in response.json()["samples"]
+        if "exampleimage" in sample["metadata"]["url"]
+    ]
+    assert [sample["metadata"]["image_id"] for sample in samples] == [image_id] * 2
+
+    response = await async_client.get(f"image/{image_id}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.content == data
+
+    response = await async_client.get(f"image/{image_id}?size=16")
+    assert response.status_code == 200
+    with Image.open(BytesIO(response.content)) as img:
+        assert img.size == (16, 8)
+
+    response = await async_client.get(
+        f"image/{image_id}", headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == 200
+    response = await async_client.get(
+        f"image/{image_id}", headers={"If-None-Match": f'"{image_id}"'}
+    )
+    assert response.status_code == 304
+
+    response = await async_client.get(f"image/{'0' * 64}")
+    assert response.status_code == 404
+    response = await async_client.get(
+        f"image/{'0' * 64}", headers={"If-None-Match": f'"{"0" * 64}"'}
+    )
+    assert response.status_code == 404
+
+    response = await async_client.delete("sample?type=image")
+    assert response.status_code == 200
@@ -0,0 +1,31 @@
+import pytest
+from io import BytesIO
+from PIL import Image
+from scraper_engine.image_header import probe_image_size
+
+
+@pytest.mark.parametrize(
+    "format, options",
+    [
+        ("PNG", {}),
+        ("GIF", {}),
+        ("JPEG", {}),
+        ("JPEG", {"progressive": True}),
+        ("WEBP", {"lossless": True}),
+        ("WEBP", {"quality": 80}),
+        ("BMP", {}),
+    ],
+)
+def test_probe_image_size(format: str, options: dict):
+    buffered = BytesIO()
+    Image.new("RGB", (321, 123)).save(buffered, format=format, **options)
+
+    assert probe_image_size(buffered.getvalue()[:4096]) == (321, 123)
+
+
+def test_probe_image_size_needs_more_bytes():
+    buffered = BytesIO()
+    Image.new("RGB", (321, 123)).save(buffered, format="PNG")
+
+    assert probe_image_size(buffered.getvalue()[:16]) is None
+    assert probe_image_size(b"<html></html>") is None
@@ -0,0 +1,68 @@
+import pytest
+from scraper_engine.language_detector import (
+    LanguageDetector,
+    Script,
+    dominant_script,
+    sample_text,
+)
+from scraper_engine.language_supported import LanguageSupported
+
+
+TEXTS = {
+    LanguageSupported.EN: "This is an English sentence, long enough to be detected reliably.",
+    LanguageSupported.FR: "Ceci est une phrase en français, assez longue pour être détectée.",
+    LanguageSupported.RU: "Это русский текст, достаточно длинный для определения языка.",
+    LanguageSupported.JA: "これは日本語の文章です。ひらがなとカタカナを含みます。",
+    LanguageSupported.KO: "이것은 언어 감지를 위한 한국어 문장입니다.",
+    LanguageSupported.TH: "นี่คือข้อความภาษาไทยสำหรับการทดสอบ",
+    LanguageSupported.HE: "זהו טקסט בעברית לצורך בדיקה של המערכת",
+    LanguageSupported.ZH_CN: "这是一个用于测试系统的中文文本，它足够长，可以检测语言。",
+}
+
+
+@pytest.mark.parametrize("language", list(TEXTS))
+def test_is_language(language: LanguageSupported):
+    detector = LanguageDetector("langdetect", sample_chars=1024, cache_size=16)
+
+    assert detector.is_language(TEXTS[language], language)
+    for other in TEXTS:
+        if other != language:
+            assert not detector.is_language(TEXTS[language], other)
+
+
+def test_script_short_circuit():
+    assert dominant_script(TEXTS[LanguageSupported.JA]) == Script.KANA
+    assert dominant_script(TEXTS[LanguageSupported.ZH_CN]) == Script.HAN
+    assert dominant_script(TEXTS[LanguageSupported.KO]) == Script.HANGUL
+    assert dominant_script("1234 !?") is None
+
+
+def test_kanji_japanese():
+    detector = LanguageDetector("langdetect", sample_chars=1024, cache_size=16)
+    text = "国立大学法人運営費交付金削減問題、文部科学省来年度予算概算要求関連経費計上方針を固めた。"
+
+    assert dominant_script(text) == Script.HAN
+    assert detector.is_language(text, LanguageSupported.JA)
+    assert not detector.is_language(text, LanguageSupported.ZH_CN)
+    assert not detector.is_language(
+        TEXTS[LanguageSupported.ZH_CN], LanguageSupported.JA
+    )
+
+
+def test_detection_cache():
+    detector = LanguageDetector("langdetect", sample_chars=1024, cache_size=1)
+    text = TEXTS[LanguageSupported.EN]
+
+    assert detector.detect(text) == "en"
+    assert list(detector.cache.values()) == ["en"]
+    detector.detect(TEXTS[LanguageSupported.FR])
+    assert list(detector.cache.values()) == ["fr"], "The cache should stay bounded."
+
+
+def test_sample_text():
+    text = "a" * 1000 + "b" * 1000 + "c" * 1000
+
+    assert sample_text("short", 12) == "short"
+    sample = sample_text(text, 300)
+    assert len(sample) <= 302
+    assert sample.split() == ["a" * 100, "b" * 100, "c" * 100]
@@ -0,0 +1,29 @@
+import asyncio
+import pytest
+from services.micro_batcher import MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+        if "fail" in items:
+            raise ValueError("failed batch")
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(handler, max_size=3, window=0.05, max_in_flight=2)
+
+    results = await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+    assert results == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2], [3, 4]]
+
+    with pytest.raises(ValueError, match="failed batch"):
+        await asyncio.gather(batcher.submit("fail"), batcher.submit("other"))
+
+    stats = batcher.stats("test")
+    assert (stats.batches, stats.items, stats.full_batches) == (3, 7, 1)
+    assert stats.failures == 1
+    sizes = [(bucket.le, bucket.count) for bucket in stats.sizes]
+    assert sizes == [(1, 0), (2, 2), (4, 1)]
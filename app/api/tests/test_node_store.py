@@ -0,0 +1,92 @@
+import pytest
+import sys
+from bs4 import BeautifulSoup
+from scraper_engine import scraper_graph
+from scraper_engine.html_parser import HtmlParser
+from scraper_engine.language_supported import LanguageSupported
+from scraper_engine.node_store import Node, NodeStore
+from scraper_engine.scraper_graph import ScraperGraph
+
+
+PAGE = """<html><body>
+  <div><p>First</p><p>Second</p></div>
+  <ul><li>One</li><li>Two</li></ul>
+</body></html>"""
+
+
+def analyze(content: str) -> ScraperGraph:
+    return ScraperGraph.analyze(
+        content.encode(),
+        "https://example.com/",
+        False,
+        LanguageSupported.EN,
+        HtmlParser.HTML_PARSER,
+    )
+
+
+def test_node_order():
+    graph = analyze(PAGE)
+    store = graph.store
+
+    tags = [name for name in store.names if name != "text"]
+    soup = BeautifulSoup(PAGE, "html.parser")
+    assert tags == ["[document]"] + [tag.name for tag in soup.find_all(True)]
+    for index in range(1, len(store)):
+        parent = store.parents[index]
+        assert parent < index  # document (pre-order) order
+        assert store.depths[index] == store.depths[parent] + 1
+        assert any(child is store.data[index] for child in store.data[parent])
+
+
+def test_ends_and_overlaps():
+    graph = analyze(PAGE)
+    store = graph.store
+    div = store.node(store.names.index("div"))
+    ul = store.node(store.names.index("ul"))
+    first = store.node(store.names.index("p"))
+
+    assert store.ends[0] == len(store)
+    assert div.end == ul.index
+    for index in range(div.index + 1, div.end):
+        assert store.node(index).parent.index >= div.index
+    assert div.overlaps(first) and first.overlaps(div)
+    assert div.overlaps(div)
+    assert not div.overlaps(ul) and not ul.overlaps(first)
+    assert graph.node_text(div) == "First Second"
+
+
+def test_subset():
+    graph = analyze(PAGE)
+    store = graph.store
+    indexes = [i for i, name in enumerate(store.names) if name in ("p", "li")]
+
+    subset = store.subset(indexes)
+
+    assert len(subset) == 4
+    assert subset.names == ["p", "p", "li", "li"]
+    assert subset.data == [store.data[i] for i in indexes]
+    assert subset.scores == [store.scores[i] for i in indexes]
+    assert subset.parents == [-1] * 4
+    assert subset.ends == [1, 2, 3, 4]
+    assert not subset.node(0).overlaps(subset.node(1))
+    assert subset.node(1) == Node(subset, 1) != store.node(indexes[1])
+
+
+def test_empty_store():
+    store = NodeStore()
+
+    assert len(store) == 0
+    assert len(store.subset([])) == 0
+
+
+def test_very_deep_document(monkeypatch: pytest.MonkeyPatch):
+    depth = sys.getrecursionlimit() * 2
+    monkeypatch.setattr(scraper_graph, "SCRAPER_MAX_DEPTH", depth + 10)
+    text = "The text of the page, at the bottom of a very deep document."
+    page = f"<html><body>{'<div>' * depth}<p>{text}</p>{'</div>' * depth}</body>"
+
+    graph = analyze(page)
+
+    assert not graph.truncated
+    assert max(graph.store.depths) > depth
+    assert graph.node_text(graph.get_best_node()) == text
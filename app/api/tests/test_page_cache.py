@@ -0,0 +1,46 @@
+import os
+import pytest
+import time
+from scraper_engine import page_cache
+from scraper_engine.page_cache import CachedPage, PageCache
+
+
+def page(index: int, size: int = 1000) -> CachedPage:
+    return CachedPage(url=f"https://example.com/{index}", content=b"x" * size, etag="1")
+
+
+@pytest.mark.asyncio
+async def test_page_cache_directory_cap(tmp_path):
+    cache = PageCache(0, str(tmp_path), directory_max_bytes=5000)
+    for index in range(4):
+        await cache.put(page(index))
+        os.utime(cache.path(page(index).url), (index, index))
+    assert await cache.get(page(0).url) is not None  # refreshed: evicted last
+
+    for index in range(4, 7):
+        await cache.put(page(index))
+
+    assert sum(file.stat().st_size for file in tmp_path.iterdir()) <= 5000
+    assert await cache.get(page(0).url) is not None
+    assert await cache.get(page(1).url) is None
+    assert await cache.get(page(6).url) is not None
+
+
+@pytest.mark.asyncio
+async def test_page_cache_temporary_files(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    cache = PageCache(0, str(tmp_path), directory_max_bytes=5000)
+    leftover = tmp_path / f"{page_cache.TEMPORARY_PREFIX}crashed"
+    leftover.write_bytes(b"x" * 100)
+    old = time.time() - page_cache.TEMPORARY_MAX_AGE - 1
+    os.utime(leftover, (old, old))
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "replace", fail)
+        await cache.put(page(0))
+    assert list(tmp_path.iterdir()) == [leftover]
+
+    await cache.put(page(1))
+    assert [file.name for file in tmp_path.iterdir()] == [cache.key(page(1).url)]
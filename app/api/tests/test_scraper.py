@@ -1,3 +1,4 @@
+import json
 import pytest
 from httpx import AsyncClient
 from fastapi import status
@@ -16,10 +17,14 @@ async def test_scrape_page(async_client: AsyncClient):
             "language": "en",
             "type": "text",
             "content": "H  is  working on frontier action models,  to boost the productivity of workers Outrageous AI capabilities for task automation & decision-making. Join us",
+            "image_id": None,
+            "truncated": False,
         },
         "status": "success",
         "message": "Text content was successfully extracted from the page.",
         "database_log": "Sample created successfully",
+        "cached": False,
+        "candidates": [],
     }
 
     response = await async_client.post("/scraper", json=request_payload)
@@ -34,3 +39,119 @@ async def test_scrape_page(async_client: AsyncClient):
         response_data["metadata"]["url"] == request_payload["url"]
     ), "URL in the response does not match the request."
     assert response_data["metadata"]["content"], "The content should not be empty."
+
+
+@pytest.mark.asyncio
+async def test_scrape_page_cached(async_client: AsyncClient):
+    request_payload = {"url": "https://www.hcompany.ai/", "image_search": False}
+
+    # prime the cache, whatever the tests run before
+    response = await async_client.post(
+        "/scraper", json={**request_payload, "max_age": 0}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = await async_client.post("/scraper", json=request_payload)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response_data = response.json()
+    assert response_data["cached"], "The second scrape should hit the result cache."
+    assert response_data["database_log"] == "Sample already exists and was not added."
+
+    response = await async_client.post(
+        "/scraper", json={**request_payload, "max_age": 0}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert not response.json()["cached"], "max_age 0 should bypass the cache."
+
+
+@pytest.mark.asyncio
+async def test_scrape_page_top_k(async_client: AsyncClient):
+    request_payload = {"url": "https://www.hcompany.ai/", "k": 3, "max_age": 0}
+
+    response = await async_client.post("/scraper", json=request_payload)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response_data = response.json()
+    candidates = response_data["candidates"]
+    assert 0 < len(candidates) <= 2, "k - 1 candidates should follow the best node."
+    scores = [candidate["score"] for candidate in candidates]
+    assert scores == sorted(scores, reverse=True)
+    assert all(candidate["content"] for candidate in candidates)
+
+
+@pytest.mark.asyncio
+async def test_scrape_pages_batch(async_client: AsyncClient):
+    request_payload = {
+        "items": [
+            {"url": "https://www.hcompany.ai/", "image_search": False},
+            {"url": "https://localhost:1/", "image_search": False},
+        ]
+    }
+
+    response = await async_client.post("/scraper/batch", json=request_payload)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    results = {
+        result["index"]: result
+        for result in map(json.loads, response.text.splitlines())
+    }
+    assert sorted(results) == [0, 1], "Every item should have a response line."
+    assert results[0]["status"] == "success"
+    assert results[1]["status"] == "failed", "Failures should be reported inline."
+
+
+@pytest.mark.asyncio
+async def test_scrape_page_job(async_client: AsyncClient):
+    request_payload = {"url": "https://www.hcompany.ai/", "max_age": 0}
+
+    response = await async_client.post("/scraper/jobs", json=request_payload)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = response.json()
+
+    response = await async_client.get(f"/scraper/jobs/{job['id']}?wait=30")
+    assert response.status_code == status.HTTP_200_OK
+    job = response.json()
+    assert job["status"] == "done"
+    assert job["result"]["status"] == "success"
+    assert job["result"]["metadata"]["url"] == request_payload["url"]
+
+    response = await async_client.get("/scraper/jobs/000000000000000000000000")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_crawl_pages(async_client: AsyncClient):
+    request_payload = {
+        "url": "https://www.hcompany.ai/",
+        "max_pages": 3,
+        "max_depth": 1,
+    }
+
+    response = await async_client.post("/scraper/crawl", json=request_payload)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    results = list(map(json.loads, response.text.splitlines()))
+    assert 1 <= len(results) <= 3, "The page budget should bound the crawl."
+    assert results[0]["depth"] == 0
+    assert results[0]["metadata"]["url"] == request_payload["url"]
+    assert all(result["depth"] <= 1 for result in results)
+    urls = [result["metadata"]["url"] for result in results]
+    assert len(set(urls)) == len(urls), "Every page should be scraped once."
+
+
+@pytest.mark.asyncio
+async def test_scrape_page_deadline(async_client: AsyncClient):
+    request_payload = {"url": "https://www.hcompany.ai/", "max_age": 0}
+
+    response = await async_client.post(
+        "/scraper", json={**request_payload, "timeout": 0.001}
+    )
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+
+    response = await async_client.post(
+        "/scraper", json=request_payload, headers={"X-Request-Timeout": "0.001"}
+    )
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
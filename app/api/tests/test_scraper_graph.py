@@ -0,0 +1,153 @@
+import pickle
+import pytest
+from bs4 import BeautifulSoup, Tag
+from typing import Optional, Tuple
+from scraper_engine import scraper_graph
+from scraper_engine.html_parser import HtmlParser
+from scraper_engine.language_supported import LanguageSupported
+from scraper_engine.scraper_graph import ScraperGraph
+
+
+ARTICLE = "This is the article of the page, long enough to be the best node. " * 5
+PAGE = (
+    f"<html><body><p>{ARTICLE}</p>{'<div><p>More text.</p></div>' * 50}</body></html>"
+)
+
+
+NESTED_PAGES = [
+    """<html><body>
+      <div>
+        <p>  The first paragraph of the page,   written in English.  </p>
+        <!-- a comment between the paragraphs -->
+        <p>Second <b>bold</b> <i> words </i>
+           and the tail of the second paragraph of the page.</p>
+      </div>
+      <section><h2> Title </h2>
+        <p>Another paragraph <!-- inline comment --> with a comment inside it.</p>
+      </section>
+    </body></html>""",
+    f"""<html><body>{"<div> <span> </span>" * 30}
+      <p>Deep text of the page, in English, inside many nested blocks.</p>
+      {"</div>" * 30}<p>  </p><li><!-- only a comment --></li></body></html>""",
+    """<html><body>
+      <p>Ceci est un long paragraphe écrit en français, plus long que les autres
+         paragraphes de la page, pour vérifier que la langue est bien contrôlée.</p>
+      <div><p>A short paragraph written in English for the page.</p></div>
+    </body></html>""",
+]
+
+
+def analyze(content: str) -> ScraperGraph:
+    return ScraperGraph.analyze(
+        content.encode(),
+        "https://example.com/",
+        False,
+        LanguageSupported.EN,
+        HtmlParser.HTML_PARSER,
+    )
+
+
+def test_node_budget(monkeypatch: pytest.MonkeyPatch):
+    assert not analyze(PAGE).truncated
+
+    monkeypatch.setattr(scraper_graph, "SCRAPER_MAX_NODES", 20)
+    graph = analyze(PAGE)
+
+    assert graph.truncated
+    assert len(graph.store) == 20
+    assert graph.node_text(graph.get_best_node()) == ARTICLE.strip()
+
+
+def test_depth_budget(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(scraper_graph, "SCRAPER_MAX_DEPTH", 4)
+    graph = analyze(
+        f"<html><body><p>{ARTICLE}<span><b>Deep</b></span></p></body></html>"
+    )
+
+    assert graph.truncated
+    assert max(graph.store.depths) == 4
+    assert graph.node_text(graph.get_best_node()) == ARTICLE.strip()
+
+
+def test_detached_image_graph_is_compact():
+    blocks = '<div><p>Text.</p><img src="/a.png" alt="A"></div>' * 2000
+    content = f"<html><body>{blocks}</body></html>".encode()
+    graph = ScraperGraph.analyze(
+        content, "https://example.com/", True, LanguageSupported.EN, detached=True
+    )
+
+    data = pickle.dumps(graph)
+
+    assert b"bs4" not in data
+    copy = pickle.loads(data)
+    assert len(copy.store) == 2000
+    assert copy.best_nodes == [] and copy.best_node.store is copy.store
+
+
+def test_detached_image_graph_without_images():
+    graph = ScraperGraph.analyze(
+        PAGE.encode(), "https://example.com/", True, LanguageSupported.EN, detached=True
+    )
+
+    assert graph.best_node is None
+    graph.select_best_nodes()
+    with pytest.raises(ScraperGraph.NoFound):
+        graph.get_best_node()
+
+
+def test_image_template_out_of_budget(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(scraper_graph, "SCRAPER_MAX_NODES", 20)
+    content = f'<html><body>{PAGE}<img src="/a.png"></body></html>'.encode()
+
+    graph = ScraperGraph.analyze(
+        content,
+        "https://example.com/",
+        True,
+        LanguageSupported.EN,
+        template="html[0]/body[0]/img[0]",
+    )
+
+    assert graph.truncated
+    assert graph.template_node is None
+
+
+def reference_best(
+    graph: ScraperGraph, soup: BeautifulSoup
+) -> Tuple[Optional[Tag], int]:
+    """
+    Best node of the recursive scoring: the text of every relevant tag from
+    `get_text(" ")`, and the first node of the highest score in pre-order.
+    """
+    best, best_score = None, -1
+    stack = [(soup, 0)]
+    while stack:
+        element, depth = stack.pop()
+        if element.name in ScraperGraph.relevant_text_tags:
+            text = element.get_text(" ").strip()
+            if text and graph.is_language(text):
+                score = depth * len(element.contents) * len(text)
+                if score > best_score:
+                    best, best_score = element, score
+        stack.extend(
+            (child, depth + 1)
+            for child in reversed(element.contents)
+            if isinstance(child, Tag)
+        )
+    return best, best_score
+
+
+@pytest.mark.parametrize("page", NESTED_PAGES)
+def test_text_density_matches_get_text(page: str):
+    graph = analyze(page)
+
+    for index, data in enumerate(graph.store.data):
+        if isinstance(data, Tag):
+            node = graph.store.node(index)
+            text = data.get_text(" ").strip()
+            assert graph.calculate_text_density(node) == len(text)
+            assert graph.node_text(node) == text
+
+    best, score = reference_best(graph, graph.soup)
+    node = graph.get_best_node()
+    assert node.data is best
+    assert node.score == score
@@ -0,0 +1,67 @@
+import pytest
+from io import BytesIO
+from PIL import Image
+from scraper_engine import svg_image
+from scraper_engine.svg_image import SvgRenderCache, svg_length, svg_size
+
+
+def svg(attributes: str) -> bytes:
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" {attributes}><rect/></svg>'.encode()
+    )
+
+
+@pytest.mark.parametrize(
+    "value, length",
+    [("12", 12), ("12px", 12), (" 1.5in ", 144), ("3pt", 4), ("1e1", 10)],
+)
+def test_svg_length(value: str, length: float):
+    assert svg_length(value) == pytest.approx(length)
+
+
+@pytest.mark.parametrize("value", [None, "", "100%", "auto", "12furlongs"])
+def test_svg_length_relative(value: str):
+    assert svg_length(value) is None
+
+
+@pytest.mark.parametrize(
+    "attributes, size",
+    [
+        ('width="120" height="40"', (120, 40)),
+        ('width="1in" height="2cm"', (96, 76)),
+        ('viewBox="0 0 24 16"', (24, 16)),
+        ('width="48" viewBox="0,0,24,16"', (48, 32)),
+        ('height="100%" width="10mm" viewBox="0 0 2 1"', (38, 19)),
+        ('width="100%" height="100%"', None),
+        ("", None),
+    ],
+)
+def test_svg_size(attributes: str, size: tuple):
+    assert svg_size(svg(attributes)) == size
+
+
+def test_svg_size_not_svg():
+    assert svg_size(b"<html></html>") is None
+    assert svg_size(b"not xml") is None
+
+
+@pytest.mark.asyncio
+async def test_svg_render_cache(monkeypatch: pytest.MonkeyPatch):
+    rendered = []
+
+    def svg2png(bytestring: bytes) -> bytes:
+        rendered.append(bytestring)
+        buffered = BytesIO()
+        Image.new("RGB", (12, 8)).save(buffered, format="PNG")
+        return buffered.getvalue()
+
+    monkeypatch.setattr(svg_image.cairosvg, "svg2png", svg2png, raising=False)
+    cache = SvgRenderCache(max_bytes=2**20)
+
+    first = await cache.render(svg('width="12" height="8"'))
+    second = await cache.render(svg('width="12" height="8"'))
+    await cache.render(svg('width="24" height="16"'))
+
+    assert first == second
+    assert len(rendered) == 2, "The same SVG should be rendered once."
+    assert cache.size == sum(len(png) for png in cache.images.values())
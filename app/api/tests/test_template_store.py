@@ -0,0 +1,104 @@
+from bs4 import BeautifulSoup
+from scraper_engine.html_parser import HtmlParser
+from scraper_engine.language_supported import LanguageSupported
+from scraper_engine.scraper_graph import ScraperGraph
+from scraper_engine.template_store import (
+    TemplateStore,
+    element_path,
+    path_depth,
+    resolve_path,
+)
+
+
+PAGE = """
+<html><body>
+  <div><p>Menu</p></div>
+  <div>
+    <p>Short</p>
+    <p>{article}</p>
+  </div>
+</body></html>
+"""
+ARTICLE = "This is the article of the page, long enough to be the best node. " * 5
+
+
+def test_element_path():
+    soup = BeautifulSoup(PAGE.format(article=ARTICLE), "html.parser")
+    paragraph = soup.find_all("p")[2]
+
+    path = element_path(paragraph)
+
+    assert path == "html[0]/body[0]/div[1]/p[1]"
+    assert path_depth(path) == 4
+    assert resolve_path(soup, path) is paragraph
+    assert resolve_path(soup, "html[0]/body[0]/div[2]") is None
+
+
+def test_template_store():
+    store = TemplateStore(min_confirmations=2, max_domains=1, min_score_ratio=0.5)
+    key = store.key("https://Example.com/a", False, None)
+    path = "html[0]/body[0]/div[1]/p[1]"
+
+    store.record(key, path, 300, used=False, hit=False)
+    assert store.lookup(key) is None
+    store.record(key, path, 200, used=False, hit=False)
+    assert store.lookup(key) == (path, 100)
+    store.record(key, path, 250, used=True, hit=True)
+
+    stats = store.stats()
+    assert (stats.hits, stats.fallbacks, stats.misses) == (1, 0, 2)
+    assert stats.templates[0].domain == "example.com"
+    assert stats.templates[0].active
+
+    store.record(store.key("https://other.com/", False, None), path, 1, False, False)
+    assert store.lookup(key) is None  # evicted
+
+
+def test_template_store_audit():
+    store = TemplateStore(min_confirmations=1, max_domains=10, audit_interval=3)
+    key = store.key("https://example.com/", False, None)
+    path = "html[0]/body[0]/div[1]/p[1]"
+    store.record(key, path, 100, used=False, hit=False)
+
+    assert store.lookup(key) is not None
+    assert store.lookup(key) is not None
+    assert store.lookup(key) is None  # the whole page is scored
+    store.record(key, "html[0]/body[0]/div[0]", 80, used=False, hit=False)
+
+    assert store.lookup(key) == ("html[0]/body[0]/div[0]", 40)
+    assert store.stats().audits == 1
+
+
+def test_template_analyze():
+    content = PAGE.format(article=ARTICLE).encode()
+    args = ("https://example.com/", False, LanguageSupported.EN, HtmlParser.HTML_PARSER)
+
+    full = ScraperGraph.analyze(content, *args)
+    path = full.best_path()
+    templated = ScraperGraph.analyze(content, *args, template=path)
+    wrong = ScraperGraph.analyze(content, *args, template="html[0]/body[0]/div[0]")
+
+    assert path == "html[0]/body[0]/div[1]/p[1]"
+    assert not full.template_hit
+    assert templated.template_hit and not wrong.template_hit
+    for graph in (templated, wrong):
+        assert graph.best_path() == path
+        assert graph.node_text(graph.get_best_node()) == ARTICLE.strip()
+        assert graph.get_best_node().score == full.get_best_node().score
+
+
+def test_template_weaker_than_best_node():
+    content = PAGE.format(article=ARTICLE).encode()
+    args = ("https://example.com/", False, LanguageSupported.EN, HtmlParser.HTML_PARSER)
+    store = TemplateStore(min_confirmations=1, max_domains=10, audit_interval=0)
+    key = store.key("https://example.com/", False, HtmlParser.HTML_PARSER)
+    short = "html[0]/body[0]/div[1]/p[0]"
+    store.record(key, short, 400, used=False, hit=False)  # elected by other pages
+
+    template, min_score = store.lookup(key)
+    graph = ScraperGraph.analyze(content, *args, template=template, min_score=min_score)
+    store.record(key, graph.best_path(), graph.best_node.score, True, False)
+
+    assert not graph.template_hit
+    assert graph.node_text(graph.get_best_node()) == ARTICLE.strip()
+    assert store.lookup(key) == (graph.best_path(), graph.best_node.score / 2)
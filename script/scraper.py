@@ -3,14 +3,26 @@ import base64
 from PIL import Image
 from io import BytesIO, TextIOWrapper
 from website_url import website_url
+import json
 import os
 
 
-def scrape_and_process(url_item: dict[str, bool], md_file: TextIOWrapper):
-    api_endpoint = "http://localhost/api/scraper"
+def scrape_and_process(url_items: list[dict[str, bool]], md_file: TextIOWrapper):
+    api_endpoint = "http://localhost/api/scraper/batch"
     headers = {"Content-Type": "application/json"}
-    response = requests.post(api_endpoint, headers=headers, json=url_item)
-    data = response.json()
+    with requests.post(
+        api_endpoint, headers=headers, json={"items": url_items}, stream=True
+    ) as response:
+        for line in response.iter_lines():
+            if line:
+                data = json.loads(line)
+                process(url_items[data["index"]], data, md_file)
+
+
+def process(url_item: dict[str, bool], data: dict, md_file: TextIOWrapper):
+    if data["status"] != "success":
+        print(f"Failed: {data['metadata']['url']} ({data['message']})")
+        return
 
     if url_item["image_search"]:
         image_data = base64.b64decode(data["metadata"]["content"])
@@ -33,7 +45,6 @@ if __name__ == "__main__":
     image_directory = "images"
     os.makedirs(image_directory, exist_ok=True)
     with open("output.md", "w") as md_file:
-        for item in website_url:
-            scrape_and_process(item, md_file)
+        scrape_and_process(website_url, md_file)
 
     print("Scraping completed. Check output.md for the results.")